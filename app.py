@@ -1,49 +1,97 @@
 import os
-import pickle
-import sqlite3
-import numpy as np
 import pandas as pd
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_from_directory
+from flask import Flask, Response, render_template, request, redirect, url_for, jsonify, send_from_directory, stream_with_context
 import json
-from datetime import datetime, timedelta
-import random
-import requests
+import base64
+from datetime import datetime
+import database
+import prediction_writer
+import model_registry
+import chat_store
+import intent_matcher
+import llm_gateway
+import response_cache
+import mail_dispatch
+import feature_schema
+import metrics
+import trends
 
 app = Flask(__name__)
 app.secret_key = "healthcare_secret_key_2023"
 app.config['UPLOAD_FOLDER'] = 'static/images'
 
-# SQLite Database Connection
+# SQLite Database Connection (pooled per thread, released on app context teardown)
+database.init_app(app)
+
+# Request latency histograms, hot-path spans and gauges at /metrics
+metrics.init_app(app)
+
 def get_db_connection():
-    conn = sqlite3.connect('healthcare.db')
-    conn.row_factory = sqlite3.Row  # This enables name-based access to columns
-    return conn
-
-# Load Machine Learning Models with improved error handling
-models = {}
-model_dir = "models"
-
-if os.path.exists(model_dir):
-    for fname in os.listdir(model_dir):
-        if fname.endswith(".pkl") or fname.endswith(".joblib"):
-            path = os.path.join(model_dir, fname)
-            try:
-                # Try loading with joblib first
-                import joblib
-                model_name = fname.replace(".pkl", "").replace(".joblib", "")
-                models[model_name] = joblib.load(path)
-                print(f"Loaded model: {model_name}")
-            except Exception as e:
-                print(f"Error loading model {fname} with joblib: {str(e)}")
-                try:
-                    # Fallback to pickle with specific encoding
-                    with open(path, "rb") as f:
-                        models[model_name] = pickle.load(f, encoding='latin1')
-                    print(f"Loaded model {model_name} with pickle (latin1 encoding)")
-                except Exception as e2:
-                    print(f"Error loading model {fname} with pickle: {str(e2)}")
-
-print("Loaded models:", list(models.keys()))
+    with metrics.span("db_connect"):
+        return database.get_connection()
+
+# Optional write-behind mode: prediction inserts are queued and group-committed
+# by a background thread instead of committing on the request thread
+WRITE_BEHIND = os.environ.get("PREDICTION_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+
+# Per-user API responses are cached briefly and dropped when the user gets a new
+# prediction; entries are checked against user_data_version() so that writes
+# made by other gunicorn workers also take effect at once
+user_response_cache = response_cache.UserResponseCache(ttl=float(os.environ.get("RESPONSE_CACHE_TTL", "30")))
+
+def invalidate_prediction_caches(rows):
+    for user_id in {row[0] for row in rows}:
+        user_response_cache.invalidate_user(user_id)
+
+def save_predictions(rows):
+    if WRITE_BEHIND:
+        # Caches are invalidated again once the background writer commits
+        queued = prediction_writer.start_writer(on_commit=invalidate_prediction_caches).submit(rows)
+        invalidate_prediction_caches(rows[:queued])
+        if queued == len(rows):
+            return
+        # Queue full or writer stopped: write the remainder directly (backpressure)
+        rows = rows[queued:]
+    conn = get_db_connection()
+    with metrics.span("db_commit"):
+        conn.executemany(prediction_writer.INSERT_PREDICTION_SQL, rows)
+        conn.commit()
+    invalidate_prediction_caches(rows)
+
+# Machine Learning Models: discovered at startup, loaded lazily on first use.
+# MODEL_PRELOAD lists models to load up front in parallel ("all", or "predict"
+# for just the ones predict_targets reads), MODEL_MMAP_MODE=r
+# memory-maps model arrays and MODEL_WATCH_INTERVAL enables hot reload.
+# Compiled forests (*.forest.npz) are served in place of sklearn models unless
+# MODEL_PREFER_COMPILED=0; batches over MODEL_COMPILED_MAX_ROWS rows still go
+# to the sklearn model, which is faster per row at that size.
+model_dir = os.environ.get("MODEL_DIR", "models")
+models = model_registry.ModelRegistry(
+    model_dir,
+    mmap_mode=os.environ.get("MODEL_MMAP_MODE") or None,
+    prefer_compiled=os.environ.get("MODEL_PREFER_COMPILED", "1").lower() not in ("0", "false", "no"),
+    compiled_max_rows=int(os.environ.get("MODEL_COMPILED_MAX_ROWS", "500"))
+)
+
+def predict_models():
+    # Same choice as predict_targets: the multi-output forest when there is one
+    if "RandomForest_multioutput" in models:
+        return ["RandomForest_multioutput"]
+    return ["RandomForest_disease", "RandomForest_medication_name", "RandomForest_dosage"]
+
+preload_models = [name.strip() for name in os.environ.get("MODEL_PRELOAD", "").split(",") if name.strip()]
+if preload_models == ["all"]:
+    models.load_parallel(models.available())
+elif preload_models == ["predict"]:
+    models.load_parallel(predict_models())
+elif preload_models:
+    models.load_parallel(preload_models)
+
+model_watch_interval = float(os.environ.get("MODEL_WATCH_INTERVAL", "0"))
+if model_watch_interval > 0:
+    models.start_watcher(model_watch_interval)
+
+print("Available models:", models.available())
 
 # Health tips data
 health_tips = [
@@ -73,8 +121,46 @@ health_tips = [
     }
 ]
 
-# Chat history storage (in-memory for demo, should be in database for production)
-chat_history = {}
+# Constant API payloads, serialized once with ETag/Last-Modified validators
+health_tips_payload = response_cache.StaticPayload(health_tips)
+
+# Chat history storage: bounded per-session ring buffers with TTL/LRU eviction,
+# in-process by default or shared through SQLite with CHAT_STORE=sqlite
+chat_history = chat_store.create_store()
+
+# Fallback chat responder: keyword intents compiled once into a single matcher
+intent_engine = intent_matcher.load_intents()
+
+# Upstream LLM client (None when no API key or base URL is configured)
+llm = llm_gateway.create_gateway()
+
+# Gauges read from the components' own stats at scrape time
+metrics.registry.gauge("model_load_seconds", "Time taken to load each model", lambda: {
+    name: info["load_seconds"] for name, info in models.stats()["loaded"].items()}, ("model",))
+metrics.registry.gauge("models_loaded", "Models currently loaded", lambda: len(models.loaded()))
+metrics.registry.gauge("chat_store_sessions", "Chat sessions held", lambda: chat_history.stats()["sessions"])
+metrics.registry.gauge("chat_store_bytes", "Chat message bytes held", lambda: chat_history.stats()["bytes"])
+metrics.registry.gauge("db_pool_open_connections", "Pooled SQLite connections open",
+                       lambda: database.pool.stats()["open_connections"])
+metrics.registry.gauge("response_cache_hit_rate", "Per-user response cache hit rate",
+                       lambda: user_response_cache.stats()["hit_rate"])
+
+def get_user_stats(cursor, user_id):
+    # Precomputed by the trigger on predictions, see database.MIGRATIONS
+    cursor.execute("""
+        SELECT total_predictions, last_prediction, latest_condition
+        FROM user_prediction_stats
+        WHERE user_id=?
+    """, (user_id,))
+    stats = cursor.fetchone()
+    if stats is None:
+        return {"total_predictions": 0, "last_prediction": None, "latest_condition": None}
+    return dict(stats)
+
+def user_data_version(conn, user_id):
+    # Bumped by the triggers on every insert and delete, see database.MIGRATIONS (4)
+    row = conn.execute("SELECT version FROM user_prediction_stats WHERE user_id=?", (user_id,)).fetchone()
+    return row[0] if row else 0
 
 # Debug route for database testing
 @app.route("/debug/database")
@@ -91,15 +177,36 @@ def debug_database():
         cursor.execute("SELECT COUNT(*) as count FROM predictions")
         predictions_count = cursor.fetchone()[0]
         
-        conn.close()
-        
         return jsonify({
             "predictions_table_exists": bool(predictions_table),
-            "predictions_count": predictions_count
+            "predictions_count": predictions_count,
+            "connection_pool": database.pool.stats(),
+            "write_behind": prediction_writer.writer.stats() if prediction_writer.writer else None,
+            "response_cache": user_response_cache.stats()
         })
     except Exception as e:
         return f"Database error: {str(e)}"
 
+@app.route("/debug/models")
+def debug_models():
+    return jsonify(models.stats())
+
+@app.route("/debug/chat")
+def debug_chat():
+    return jsonify({
+        "chat_store": chat_history.stats(),
+        "llm": llm.stats() if llm is not None else None
+    })
+
+@app.route("/debug/mail")
+def debug_mail():
+    mailer = mail_dispatch.get_dispatcher()
+    message_id = request.args.get("id", type=int)
+    return jsonify({
+        "dispatcher": mailer.stats() if mailer is not None else None,
+        "message": mailer.status(message_id) if mailer is not None and message_id is not None else None
+    })
+
 # API ENDPOINTS
 
 @app.route("/api/dashboard-data")
@@ -110,16 +217,23 @@ def api_dashboard_data():
     
     conn = get_db_connection()
     cursor = conn.cursor()
+    version = user_data_version(conn, user_id)
+    cached = user_response_cache.get(user_id, request.full_path, version)
+    if cached is not None:
+        return response_cache.json_response(cached)
     
     # Get recent predictions
-    cursor.execute("""
-        SELECT prediction, medication, dosage, created_at 
-        FROM predictions 
-        WHERE user_id=? 
-        ORDER BY created_at DESC 
-        LIMIT 5
-    """, (user_id,))
-    recent_predictions = cursor.fetchall()
+    with metrics.span("db_query"):
+        cursor.execute("""
+            SELECT prediction, medication, dosage, created_at 
+            FROM predictions 
+            WHERE user_id=? 
+            ORDER BY created_at DESC 
+            LIMIT 5
+        """, (user_id,))
+        recent_predictions = cursor.fetchall()
+        stats = get_user_stats(cursor, user_id)
+        summary = trends.recent_summary(conn, user_id)
     
     # Convert to list of dictionaries for JSON serialization
     predictions_list = []
@@ -131,34 +245,81 @@ def api_dashboard_data():
             "created_at": pred["created_at"]
         })
     
-    # Generate sample health data
-    health_score = 85
-    steps_today = random.randint(6000, 10000)
-    water_intake = random.randint(4, 8)
-    sleep_hours = round(random.uniform(6.5, 8.5), 1)
-    
-    conn.close()
-    
-    return jsonify({
-        "health_score": health_score,
-        "steps_today": steps_today,
-        "water_intake": water_intake,
-        "sleep_hours": sleep_hours,
+    # Health score from the last 30 days of vitals; steps, water and sleep
+    # aren't recorded by the app, so they stay empty
+    cached = user_response_cache.put(user_id, request.full_path, {
+        "health_score": summary["health_score"],
+        "steps_today": None,
+        "water_intake": None,
+        "sleep_hours": None,
+        "vitals": summary,
         "recent_predictions": predictions_list,
+        "stats": stats,
         "username": username
-    })
+    }, version=version)
+    return response_cache.json_response(cached)
 
 @app.route("/api/health-trends")
 def api_health_trends():
-    # Sample health trends data (anonymous access)
-    trends_data = {
-        "labels": ["Jan", "Feb", "Mar", "Apr", "May", "Jun"],
-        "health_scores": [72, 75, 78, 80, 82, 85],
-        "steps": [6500, 7200, 6800, 7500, 8000, 7800],
-        "sleep_hours": [6.5, 7.0, 7.2, 7.5, 7.8, 8.0]
-    }
+    # Anonymous access
+    user_id = 1
+    
+    # ?period=day|week|month&buckets=N, read from the rollup tables (see trends.py)
+    period = request.args.get("period", "month")
+    if period not in trends.PERIODS:
+        return jsonify({"error": f"period must be one of: {', '.join(trends.PERIODS)}"}), 400
+    buckets = request.args.get("buckets", type=int)
     
-    return jsonify(trends_data)
+    conn = get_db_connection()
+    version = user_data_version(conn, user_id)
+    cached = user_response_cache.get(user_id, request.full_path, version)
+    if cached is not None:
+        return response_cache.json_response(cached)
+    
+    with metrics.span("db_query"):
+        payload = trends.user_trends(conn, user_id, period, buckets)
+    cached = user_response_cache.put(user_id, request.full_path, payload, version=version)
+    return response_cache.json_response(cached)
+
+# Health history pagination
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 500
+HISTORY_STREAM_BATCH = 500
+
+def encode_history_cursor(created_at, record_id):
+    raw = f"{created_at}|{record_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_history_cursor(cursor_value):
+    created_at, record_id = base64.urlsafe_b64decode(cursor_value.encode()).decode().rsplit("|", 1)
+    return created_at, int(record_id)
+
+def history_record(record):
+    return {
+        "prediction": record["prediction"],
+        "medication": record["medication"],
+        "dosage": record["dosage"],
+        "created_at": record["created_at"]
+    }
+
+def stream_health_history(cursor, fmt):
+    # Rows are pulled from the cursor in batches, never the whole history at once
+    if fmt == "json":
+        yield "["
+    first = True
+    while True:
+        rows = cursor.fetchmany(HISTORY_STREAM_BATCH)
+        if not rows:
+            break
+        for record in rows:
+            item = json.dumps(history_record(record))
+            if fmt == "json":
+                yield item if first else "," + item
+            else:
+                yield item + "\n"
+            first = False
+    if fmt == "json":
+        yield "]"
 
 @app.route("/api/health-history")
 def api_health_history():
@@ -168,30 +329,91 @@ def api_health_history():
     conn = get_db_connection()
     cursor = conn.cursor()
     
-    cursor.execute("""
-        SELECT prediction, medication, dosage, created_at 
-        FROM predictions 
-        WHERE user_id=? 
-        ORDER BY created_at DESC
-    """, (user_id,))
-    history = cursor.fetchall()
+    # Streaming mode: ?stream=ndjson or ?stream=json returns the full history chunk by chunk
+    stream_format = request.args.get("stream")
+    if stream_format:
+        if stream_format not in ("ndjson", "json"):
+            return jsonify({"error": "stream must be 'ndjson' or 'json'"}), 400
+        cursor.execute("""
+            SELECT prediction, medication, dosage, created_at 
+            FROM predictions 
+            WHERE user_id=? 
+            ORDER BY created_at DESC, id DESC
+        """, (user_id,))
+        mimetype = "application/x-ndjson" if stream_format == "ndjson" else "application/json"
+        return Response(stream_with_context(stream_health_history(cursor, stream_format)), mimetype=mimetype)
     
-    history_list = []
-    for record in history:
-        history_list.append({
-            "prediction": record["prediction"],
-            "medication": record["medication"],
-            "dosage": record["dosage"],
-            "created_at": record["created_at"]
-        })
+    version = user_data_version(conn, user_id)
+    cached = user_response_cache.get(user_id, request.full_path, version)
+    if cached is not None:
+        return response_cache.json_response(cached)
+    
+    # Keyset pagination on (created_at, id); the row-value comparison lets SQLite
+    # seek idx_predictions_user_created to the cursor. The next page's cursor is returned
+    # in the X-Next-Cursor header so the body stays a plain list
+    try:
+        limit = min(max(int(request.args.get("limit", HISTORY_PAGE_SIZE)), 1), HISTORY_MAX_PAGE_SIZE)
+        cursor_value = request.args.get("cursor")
+        after = decode_history_cursor(cursor_value) if cursor_value else None
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+    
+    with metrics.span("db_query"):
+        if after:
+            cursor.execute("""
+                SELECT id, prediction, medication, dosage, created_at 
+                FROM predictions 
+                WHERE user_id=? AND (created_at, id) < (?, ?)
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (user_id, after[0], after[1], limit + 1))
+        else:
+            cursor.execute("""
+                SELECT id, prediction, medication, dosage, created_at 
+                FROM predictions 
+                WHERE user_id=? 
+                ORDER BY created_at DESC, id DESC
+                LIMIT ?
+            """, (user_id, limit + 1))
+        history = cursor.fetchall()
     
-    conn.close()
+    has_more = len(history) > limit
+    history = history[:limit]
+    history_list = [history_record(record) for record in history]
     
-    return jsonify(history_list)
+    headers = {}
+    if has_more:
+        last = history[-1]
+        next_cursor = encode_history_cursor(last["created_at"], last["id"])
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{url_for("api_health_history", limit=limit, cursor=next_cursor)}>; rel="next"'
+    cached = user_response_cache.put(user_id, request.full_path, history_list, headers=headers, version=version)
+    return response_cache.json_response(cached)
 
 @app.route("/api/health-tips")
 def api_health_tips():
-    return jsonify(health_tips)
+    return health_tips_payload.response()
+
+def build_chat_prompt(context, user_message):
+    # Create prompt for Google Gemini (based on workflow structure)
+    return f"""You are a helpful healthcare assistant. Provide accurate, helpful responses about health and wellness.
+
+Context from previous conversation:
+{context}
+
+Current user question: {user_message}
+
+Please provide a helpful, accurate response about health and wellness. If this involves medical advice, remind the user to consult healthcare professionals."""
+
+def chat_cache_key(context, user_message):
+    """LLM cache key: the bare question only when it opens the session (an FAQ
+    shared across users), otherwise None so the gateway keys on the full prompt"""
+    if context == chat_store.render_message("user", user_message):
+        return user_message
+    return None
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
 
 @app.route("/api/chat", methods=["POST"])
 def api_chat():
@@ -203,35 +425,25 @@ def api_chat():
         if not user_message:
             return jsonify({"error": "Message is required"}), 400
 
-        # Initialize chat history for new users
-        if user_id not in chat_history:
-            chat_history[user_id] = []
-
         # Add user message to history
-        chat_history[user_id].append({"role": "user", "content": user_message})
+        chat_history.append(user_id, "user", user_message)
 
-        # Prepare context from recent chat history (last 10 messages)
-        context = "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in chat_history[user_id][-10:]
-        ])
+        # Context from recent chat history (last 10 messages), kept up to date by the store
+        context = chat_history.context(user_id)
 
-        # Create prompt for Google Gemini (based on workflow structure)
-        prompt = f"""You are a helpful healthcare assistant. Provide accurate, helpful responses about health and wellness.
+        prompt = build_chat_prompt(context, user_message)
 
-Context from previous conversation:
-{context}
-
-Current user question: {user_message}
-
-Please provide a helpful, accurate response about health and wellness. If this involves medical advice, remind the user to consult healthcare professionals."""
-
-        # Call Google Gemini API (you'll need to set up API key)
-        # For now, return a mock response - replace with actual API call
-        response_text = generate_mock_gemini_response(user_message, context)
+        # Call Google Gemini through the gateway when configured (GEMINI_API_KEY or
+        # LLM_BASE_URL); repeated prompts are served from its cache and the mock
+        # responder answers on timeout, error or overload
+        fallback = lambda: generate_mock_gemini_response(user_message, context)
+        if llm is not None:
+            response_text = llm.generate(prompt, fallback, cache_key=chat_cache_key(context, user_message))
+        else:
+            response_text = fallback()
 
         # Add AI response to history
-        chat_history[user_id].append({"role": "assistant", "content": response_text})
+        chat_history.append(user_id, "assistant", response_text)
 
         return jsonify({
             "response": response_text,
@@ -240,34 +452,53 @@ Please provide a helpful, accurate response about health and wellness. If this i
 
     except Exception as e:
         print(f"Chat API error: {str(e)}")
+        metrics.count("chat_error")
         return jsonify({"error": "Failed to process chat message"}), 500
 
+@app.route("/api/chat/stream", methods=["POST"])
+def api_chat_stream():
+    data = request.get_json(silent=True) or {}
+    user_message = data.get('message', '')
+    user_id = data.get('user_id', 'guest')  # Default to guest for anonymous access
+
+    if not user_message:
+        return jsonify({"error": "Message is required"}), 400
+
+    # Add user message to history
+    chat_history.append(user_id, "user", user_message)
+    context = chat_history.context(user_id)
+    prompt = build_chat_prompt(context, user_message)
+
+    def generate():
+        fallback = lambda: generate_mock_gemini_response(user_message, context)
+        if llm is not None:
+            chunks = llm.stream(prompt, fallback, cache_key=chat_cache_key(context, user_message))
+        else:
+            chunks = llm_gateway.sentence_chunks(fallback())
+
+        parts = []
+        try:
+            for chunk in chunks:
+                parts.append(chunk)
+                yield sse_event("token", {"text": chunk})
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            metrics.count("chat_stream_error")
+            yield sse_event("error", {"error": "Failed to process chat message"})
+            return
+
+        # The assistant's reply joins the session history only once it is complete
+        response_text = "".join(parts)
+        chat_history.append(user_id, "assistant", response_text)
+        yield sse_event("done", {"response": response_text, "timestamp": datetime.now().isoformat()})
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 def generate_mock_gemini_response(user_message, context):
     """Mock Gemini response - replace with actual API call"""
-    # Simple keyword-based responses for demo
-    message_lower = user_message.lower()
-
-    if "headache" in message_lower:
-        return "Headaches can have many causes including stress, dehydration, or lack of sleep. I recommend staying hydrated, getting adequate rest, and if headaches persist, consulting a healthcare professional."
-    elif "exercise" in message_lower or "workout" in message_lower:
-        return "Regular exercise is great for health! Aim for at least 150 minutes of moderate aerobic activity per week. Start slowly and consult your doctor before beginning a new exercise program."
-    elif "diet" in message_lower or "nutrition" in message_lower or "food" in message_lower:
-        return "A balanced diet rich in fruits, vegetables, whole grains, and lean proteins is essential for good health. Consider consulting a registered dietitian for personalized nutrition advice."
-    elif "sleep" in message_lower or "rest" in message_lower:
-        return "Most adults need 7-9 hours of quality sleep per night. Good sleep hygiene includes maintaining a consistent schedule, creating a dark and quiet sleep environment, and avoiding screens before bedtime."
-    elif "test" in message_lower or "hi" in message_lower or "hello" in message_lower:
-        return "Hello! I'm your AI health assistant. I can help with wellness questions. Try asking about exercise, diet, sleep, or headaches for specific advice."
-    elif "health" in message_lower or "wellness" in message_lower:
-        return "Maintaining good health involves balanced nutrition, regular exercise, adequate sleep, and stress management. Remember to consult professionals for medical concerns."
-    else:
-        # Varied default responses to avoid repetition
-        defaults = [
-            "I'm here to help with your health and wellness questions. For personalized medical advice, please consult with a qualified healthcare professional. What specific topic would you like to discuss?",
-            "Health is a journey! Let's talk about nutrition, fitness, or sleep. What's on your mind today?",
-            "As your AI assistant, I can provide general wellness tips. For any symptoms, see a doctor. How can I assist?"
-        ]
-        import random
-        return random.choice(defaults)
+    # Keyword-based responses from intents.json for demo
+    return intent_engine.respond(user_message)
             
 # Routes
 @app.route("/")
@@ -288,6 +519,7 @@ def contact():
         
         # Here you would typically save this to a database
         print(f"Contact form submission: {name}, {email}, {subject}, {message}")
+        metrics.count("contact_submission")
         return redirect(url_for("contact"))
     
     return render_template("contact.html")
@@ -301,33 +533,23 @@ def dashboard():
     # Get prediction history
     conn = get_db_connection()
     cursor = conn.cursor()
-    cursor.execute("""
-        SELECT prediction, medication, dosage, created_at 
-        FROM predictions 
-        WHERE user_id=? 
-        ORDER BY created_at DESC 
-        LIMIT 5
-    """, (user_id,))
-    recent_predictions = cursor.fetchall()
-    
-    # Get health stats for dashboard
-    cursor.execute("""
-        SELECT 
-            COUNT(*) as total_predictions,
-            MAX(created_at) as last_prediction,
-            (SELECT prediction FROM predictions WHERE user_id=? ORDER BY created_at DESC LIMIT 1) as latest_condition
-        FROM predictions 
-        WHERE user_id=?
-    """, (user_id, user_id))
-    stats = cursor.fetchone()
-    
-    conn.close()
+    with metrics.span("db_query"):
+        cursor.execute("""
+            SELECT prediction, medication, dosage, created_at 
+            FROM predictions 
+            WHERE user_id=? 
+            ORDER BY created_at DESC 
+            LIMIT 5
+        """, (user_id,))
+        recent_predictions = cursor.fetchall()
+        
+        # Get health stats for dashboard
+        stats = get_user_stats(cursor, user_id)
+        summary = trends.recent_summary(conn, user_id)
     
-    # Generate some sample health data for demonstration
-    health_score = 85  # This would be calculated based on user's health data
-    steps_today = random.randint(6000, 10000)
-    water_intake = random.randint(4, 8)
-    sleep_hours = round(random.uniform(6.5, 8.5), 1)
+    # Not recorded by the app (see api_dashboard_data)
+    health_score = summary["health_score"]
+    steps_today = water_intake = sleep_hours = None
     
     return render_template("dashboard.html", 
                          username=username,
@@ -338,6 +560,32 @@ def dashboard():
                          water_intake=water_intake,
                          sleep_hours=sleep_hours)
 
+def predict_targets(features):
+    """Predict (diseases, medications, dosages) for a feature matrix, or None if no model is loaded"""
+    n_rows = len(features)
+    
+    # A single multi-output forest answers all three targets in one call
+    if "RandomForest_multioutput" in models:
+        predicted = models["RandomForest_multioutput"].predict(features)
+        return tuple([str(value) for value in predicted[:, i]] for i in range(3))
+    
+    # Otherwise one RandomForest per target
+    if "RandomForest_disease" not in models:
+        return None
+    predictions = [str(value) for value in models["RandomForest_disease"].predict(features)]
+    
+    # For medication and dosage
+    medications = ["Unknown"] * n_rows
+    dosages = ["Consult doctor"] * n_rows
+    
+    if "RandomForest_medication_name" in models:
+        medications = [str(value) for value in models["RandomForest_medication_name"].predict(features)]
+    
+    if "RandomForest_dosage" in models:
+        dosages = [str(value) for value in models["RandomForest_dosage"].predict(features)]
+    
+    return predictions, medications, dosages
+
 @app.route("/predict", methods=["GET", "POST"])
 def predict():
     # Use dummy user_id for anonymous access
@@ -345,52 +593,25 @@ def predict():
 
     if request.method == "POST":
         try:
-            # Get form data with correct feature columns (ignore gender if sent)
-            age = int(request.form["age"])
-            height_cm = float(request.form.get("height_cm", 0))
-            weight_kg = float(request.form.get("weight_kg", 0))
-            systolic_bp = float(request.form.get("systolic_bp", 0))
-            diastolic_bp = float(request.form.get("diastolic_bp", 0))
-            heart_rate = float(request.form.get("heart_rate", 0))
-            temperature = float(request.form.get("temperature", 0))
-            
-            # Create feature vector based on your dataset structure (no gender)
-            features = [[
-                age, 
-                height_cm, 
-                weight_kg, 
-                systolic_bp, 
-                diastolic_bp, 
-                heart_rate, 
-                temperature
-            ]]
+            # Feature vector in training order and units, range-checked (gender is ignored if sent)
+            features, errors = feature_schema.assemble(request.form.to_dict())
+            if errors:
+                metrics.count("prediction_rejected")
+                messages = errors[0]
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return jsonify({"success": False, "error": "; ".join(messages), "errors": messages}), 400
+                return render_template("result.html",
+                                     prediction=f"Error: {'; '.join(messages)}",
+                                     medication="N/A",
+                                     dosage="N/A"), 400
             
-            # Use RandomForest_disease model
-            if "RandomForest_disease" in models:
-                model = models["RandomForest_disease"]
-                prediction = model.predict(features)[0]
-                
-                # For medication and dosage
-                medication = "Unknown"
-                dosage = "Consult doctor"
-                
-                if "RandomForest_medication_name" in models:
-                    medication_model = models["RandomForest_medication_name"]
-                    medication = medication_model.predict(features)[0]
-                
-                if "RandomForest_dosage" in models:
-                    dosage_model = models["RandomForest_dosage"]
-                    dosage = dosage_model.predict(features)[0]
+            with metrics.span("inference"):
+                targets = predict_targets(features)
+            if targets is not None:
+                prediction, medication, dosage = (values[0] for values in targets)
                 
                 # Save prediction to database
-                conn = get_db_connection()
-                cursor = conn.cursor()
-                cursor.execute("""
-                    INSERT INTO predictions (user_id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature, prediction, medication, dosage)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (user_id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature, prediction, medication, dosage))
-                conn.commit()
-                conn.close()
+                save_predictions([(user_id, *feature_schema.storage_rows(features)[0], prediction, medication, dosage)])
                 
                 # Return JSON response for AJAX requests
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -430,6 +651,77 @@ def predict():
 
     return render_template("index.html")
 
+def load_batch_rows():
+    """(feature matrix, row errors) for a batch of vital-sign rows from a JSON array or a CSV upload"""
+    if "file" in request.files:
+        rows = pd.read_csv(request.files["file"])
+    else:
+        rows = request.get_json(silent=True)
+        if isinstance(rows, dict):
+            rows = rows.get("rows")
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("Expected a JSON array of rows or a CSV file upload")
+
+    return feature_schema.assemble(rows)
+
+@app.route("/api/predict/batch", methods=["POST"])
+def api_predict_batch():
+    # Use dummy user_id for anonymous access
+    user_id = 1
+
+    try:
+        # One feature matrix for the whole batch, each model runs once over it
+        features, errors = load_batch_rows()
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    if len(features) == 0:
+        return jsonify({"success": True, "count": 0, "rejected": 0, "results": []})
+
+    # Rows failing validation are reported back and never reach the models or the database
+    if errors:
+        metrics.count("prediction_rejected", len(errors))
+        features = features[feature_schema.valid_mask(len(features), errors)]
+    n_rows = len(features)
+
+    predictions = medications = dosages = []
+    if n_rows:
+        with metrics.span("inference"):
+            targets = predict_targets(features)
+        if targets is not None:
+            predictions, medications, dosages = targets
+        else:
+            # Fallback if models aren't loaded
+            predictions = ["Common Cold"] * n_rows
+            medications = ["Antihistamines"] * n_rows
+            dosages = ["As directed"] * n_rows
+
+    results = []
+    db_rows = []
+    accepted = iter(zip(feature_schema.storage_rows(features), predictions, medications, dosages))
+    for index in range(n_rows + len(errors)):
+        if index in errors:
+            results.append({"row": index, "errors": errors[index]})
+            continue
+        stored, prediction, medication, dosage = next(accepted)
+        results.append({
+            "prediction": prediction,
+            "medication": medication,
+            "dosage": dosage
+        })
+        db_rows.append((user_id, *stored, prediction, medication, dosage))
+
+    # Save all predictions in a single transaction
+    if db_rows:
+        save_predictions(db_rows)
+
+    return jsonify({
+        "success": True,
+        "count": n_rows,
+        "rejected": len(errors),
+        "results": results
+    })
+
 # Serve static files
 @app.route('/static/<path:filename>')
 def serve_static(filename):
@@ -460,7 +752,9 @@ def init_db():
     """)
     
     conn.commit()
-    conn.close()
+    
+    # Indexes, summary tables and other schema changes
+    database.migrate(conn)
 
 # Error handler to return JSON for API routes
 @app.errorhandler(Exception)
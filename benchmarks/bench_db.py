@@ -0,0 +1,149 @@
+"""Read/write throughput of per-request connections vs the pooled WAL layer.
+
+Run from the repository root:
+
+    python benchmarks/bench_db.py --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS predictions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        age INTEGER,
+        height_cm REAL,
+        weight_kg REAL,
+        systolic_bp REAL,
+        diastolic_bp REAL,
+        heart_rate REAL,
+        temperature REAL,
+        prediction TEXT,
+        medication TEXT,
+        dosage TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+INSERT_SQL = """
+    INSERT INTO predictions (user_id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature, prediction, medication, dosage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+READ_SQL = """
+    SELECT prediction, medication, dosage, created_at
+    FROM predictions
+    WHERE user_id=?
+    ORDER BY created_at DESC
+    LIMIT 5
+"""
+
+ROW = (1, 45, 178.0, 81.6, 120.0, 80.0, 72.0, 98.6, "Hypertension", "Lisinopril", "10mg")
+
+
+def legacy_connection(db_path):
+    # What app.py did before the pool: fresh connection, default journal mode
+    conn = sqlite3.connect(db_path, timeout=5)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def seed(db_path, rows):
+    conn = sqlite3.connect(db_path)
+    conn.execute(SCHEMA)
+    conn.executemany(INSERT_SQL, [ROW] * rows)
+    conn.commit()
+    conn.close()
+
+
+def run(mode, db_path, readers, writers, seconds):
+    pool = database.ConnectionPool(db_path) if mode == "pooled" else None
+    counts = {"read": 0, "write": 0, "errors": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def acquire():
+        return pool.get() if pool else legacy_connection(db_path)
+
+    def finish(conn):
+        if pool:
+            pool.release()
+        else:
+            conn.close()
+
+    def reader():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            conn = acquire()
+            try:
+                conn.execute(READ_SQL, (1,)).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+            finally:
+                finish(conn)
+        with lock:
+            counts["read"] += done
+            counts["errors"] += errors
+
+    def writer():
+        done = errors = 0
+        while time.perf_counter() < deadline:
+            conn = acquire()
+            try:
+                conn.execute(INSERT_SQL, ROW)
+                conn.commit()
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+            finally:
+                finish(conn)
+        with lock:
+            counts["write"] += done
+            counts["errors"] += errors
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if pool:
+        pool.close_all()
+
+    return {
+        "mode": mode,
+        "reads_per_sec": round(counts["read"] / seconds, 1),
+        "writes_per_sec": round(counts["write"] / seconds, 1),
+        "errors": counts["errors"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--rows", type=int, default=10000, help="rows to seed before measuring")
+    args = parser.parse_args()
+
+    for mode in ("per-request", "pooled"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            seed(db_path, args.rows)
+            result = run(mode, db_path, args.readers, args.writers, args.seconds)
+        print(f"{result['mode']:>12}: {result['reads_per_sec']:>10} reads/s  "
+              f"{result['writes_per_sec']:>8} writes/s  errors={result['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Single-row and batched latency of compiled forests against sklearn.
+
+Run from the repository root:
+
+    python benchmarks/bench_forest.py --rows 10000 --trees 100
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forest_compiler import compile_forest, verify_compiled  # noqa: E402
+from model_registry import BatchRoutedForest  # noqa: E402
+
+DISEASES = np.array(["Hypertension", "Diabetes", "Heart Disease", "Migraine", "Asthma", "Arthritis"])
+
+
+def synthetic_vitals(n, rng):
+    # Same seven columns and rough ranges as merged_data.csv
+    return np.column_stack([
+        rng.integers(18, 90, n),          # age
+        rng.normal(67, 4, n),             # height (in)
+        rng.normal(170, 30, n),           # weight (lb)
+        rng.normal(125, 15, n),           # systolic_bp
+        rng.normal(80, 10, n),            # diastolic_bp
+        rng.normal(74, 8, n),             # heart_rate
+        rng.normal(98.6, 0.6, n),         # temperature
+    ]).astype(np.float64)
+
+
+def timeit(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="batch size for the batched timing")
+    parser.add_argument("--trees", type=int, default=100)
+    parser.add_argument("--train-rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--max-rows", type=int, default=500, help="compiled_max_rows for the routed timing")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    X_train = synthetic_vitals(args.train_rows, rng)
+    y_train = DISEASES[(X_train[:, 3] > 130).astype(int) * 3 + (X_train[:, 0] // 30).astype(int) % 3]
+    model = RandomForestClassifier(n_estimators=args.trees, random_state=42).fit(X_train, y_train)
+    compiled = compile_forest(model)
+    # What the registry serves: compiled up to --max-rows, sklearn above
+    routed = BatchRoutedForest(compiled, lambda: model, args.max_rows)
+
+    X = synthetic_vitals(args.rows, rng)
+    print(f"identical predictions on {args.rows} rows: {verify_compiled(model, compiled, X)}")
+
+    row = X[:1]
+    for label, fn in (("sklearn", model.predict), ("compiled", compiled.predict), ("routed", routed.predict)):
+        single = timeit(lambda: fn(row), args.repeat)
+        batch = timeit(lambda: fn(X), max(3, args.repeat // 10))
+        print(f"{label:>9}: single row {single * 1e6:10.1f} us   "
+              f"batch of {args.rows} {batch * 1e3:9.2f} ms ({batch / args.rows * 1e6:.2f} us/row)")
+
+
+if __name__ == "__main__":
+    main()
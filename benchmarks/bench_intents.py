@@ -0,0 +1,80 @@
+"""Intent matching cost as the number of intents grows.
+
+Compares the compiled matcher in intent_matcher.py with the original
+if/elif ladder of substring checks. Run from the repository root:
+
+    python benchmarks/bench_intents.py --sizes 6 60 600 3000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_matcher import IntentMatcher, load_intents  # noqa: E402
+
+MESSAGES = [
+    "I have had a headache since this morning, what should I do?",
+    "Can you suggest a workout plan for beginners?",
+    "What food should I avoid for better digestion?",
+    "I can't get enough sleep lately",
+    "hello",
+    "Tell me something about my overall wellness and daily routine please",
+    "What are the side effects of ibuprofen?",
+]
+
+
+def synthetic_intents(base, total, rng):
+    # The shipped intents come first so real messages still hit them
+    intents = list(base)
+    while len(intents) < total:
+        keywords = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10)))
+                    for _ in range(3)]
+        intents.append({"name": f"intent_{len(intents)}", "keywords": keywords, "response": "..."})
+    return intents
+
+
+def ladder(intents):
+    # Equivalent of the old chain of `if keyword in message` checks; a message
+    # that matches nothing walks the whole ladder
+    def match(message):
+        lowered = message.lower()
+        for intent in intents:
+            if any(re.search(rf"\b{re.escape(k)}\b", lowered) for k in intent["keywords"]):
+                return intent
+        return None
+    return match
+
+
+def time_per_message(match, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            match(message)
+    return (time.perf_counter() - started) / (repeat * len(MESSAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[6, 60, 600, 3000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    base = load_intents().intents
+    print(f"{'intents':>8} {'compile ms':>11} {'matcher us/msg':>15} {'ladder us/msg':>14}")
+    for size in args.sizes:
+        intents = synthetic_intents(base, size, rng)
+        started = time.perf_counter()
+        matcher = IntentMatcher(intents)
+        compile_ms = (time.perf_counter() - started) * 1e3
+        fast = time_per_message(matcher.match, args.repeat)
+        slow = time_per_message(ladder(intents), max(1, args.repeat // 20))
+        print(f"{size:>8} {compile_ms:>11.1f} {fast * 1e6:>15.1f} {slow * 1e6:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
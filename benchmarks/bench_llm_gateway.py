@@ -0,0 +1,101 @@
+"""Drive llm_gateway against a local stub of the Gemini API.
+
+Starts a threaded HTTP stub that answers generateContent after a fixed
+delay (and optionally hangs past the timeout), then sends a mix of repeated
+and unique questions at fixed concurrency. Reports latency and cache hit
+rate. Run from the repository root:
+
+    python benchmarks/bench_llm_gateway.py --requests 500 --concurrency 16 --delay 0.2
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_gateway import LLMGateway  # noqa: E402
+
+FAQ = [
+    "How much water should I drink?",
+    "How many hours of sleep do I need?",
+    "What is a healthy blood pressure?",
+    "How often should I exercise?",
+]
+
+
+def make_stub(delay, hang_rate):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            prompt = json.loads(self.rfile.read(length))["contents"][0]["parts"][0]["text"]
+            time.sleep(delay * 20 if random.random() < hang_rate else delay)
+            body = json.dumps({"candidates": [{"content": {"parts": [{"text": f"stub answer to: {prompt[-40:]}"}]}}]})
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body.encode())
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--delay", type=float, default=0.2, help="stub response time in seconds")
+    parser.add_argument("--hang-rate", type=float, default=0.02, help="fraction of stub calls that exceed the timeout")
+    parser.add_argument("--faq-share", type=float, default=0.7, help="fraction of questions drawn from a small FAQ set")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_stub(args.delay, args.hang_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gateway = LLMGateway(base_url=f"http://127.0.0.1:{server.server_port}", timeout=args.delay * 5,
+                         max_concurrency=args.concurrency // 2 or 1, queue_timeout=args.delay * 5)
+
+    rng = random.Random(42)
+    questions = [rng.choice(FAQ) if rng.random() < args.faq_share else f"Unique question {i}"
+                 for i in range(args.requests)]
+
+    def ask(question):
+        started = time.perf_counter()
+        gateway.generate(f"Current user question: {question}", lambda: "fallback", cache_key=question)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(ask, questions))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    stats = gateway.stats()
+    print(json.dumps({
+        "requests": args.requests,
+        "throughput_rps": round(args.requests / elapsed, 1),
+        "latency_ms": {q: round(percentile(latencies, p) * 1e3, 2)
+                       for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "cache_hit_rate": round(stats["cache_hit_rate"], 3),
+        "upstream_calls": stats["upstream_calls"],
+        "timeouts": stats["timeouts"],
+        "throttled": stats["throttled"],
+        "fallbacks": stats["fallbacks"],
+        "upstream_ms_avg": round(stats["upstream_seconds_avg"] * 1e3, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Drive mail_dispatch against a local SMTP sink.
+
+Starts a minimal threaded SMTP server that accepts everything (optionally
+answering a fraction of messages with 451 to exercise retries, and with a
+fixed per-message delay), queues OTP emails from many threads and reports
+how long request threads were blocked, delivery latency and connection
+reuse. Run from the repository root:
+
+    python benchmarks/bench_mail.py --messages 2000 --workers 4 --delay 0.005 --fail-rate 0.05
+
+Pass --host/--port to use an external debugging server instead
+(e.g. ``python -m aiosmtpd -n -l localhost:1025``).
+"""
+import argparse
+import json
+import os
+import random
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mail_dispatch import MailDispatcher  # noqa: E402
+
+
+def make_sink(delay, fail_rate, received):
+    class SinkHandler(socketserver.StreamRequestHandler):
+        def reply(self, line):
+            self.wfile.write(line.encode() + b"\r\n")
+
+        def handle(self):
+            self.reply("220 sink ready")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                command = line.decode(errors="replace").strip().upper()
+                if command.startswith(("EHLO", "HELO")):
+                    self.reply("250 sink")
+                elif command == "DATA":
+                    self.reply("354 end with <CRLF>.<CRLF>")
+                    while self.rfile.readline() not in (b".\r\n", b".\n", b""):
+                        pass
+                    time.sleep(delay)
+                    if random.random() < fail_rate:
+                        self.reply("451 try again later")
+                    else:
+                        received.append(1)
+                        self.reply("250 queued")
+                elif command == "QUIT":
+                    self.reply("221 bye")
+                    return
+                else:
+                    # MAIL, RCPT, RSET, NOOP
+                    self.reply("250 ok")
+
+    return SinkHandler
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--senders", type=int, default=16, help="threads queueing mail (request threads)")
+    parser.add_argument("--workers", type=int, default=4, help="dispatcher SMTP workers")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.005, help="sink time per message in seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.05, help="fraction of messages answered with 451")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    args = parser.parse_args()
+
+    received = []
+    server = None
+    host, port = args.host, args.port
+    if host is None:
+        socketserver.ThreadingTCPServer.daemon_threads = True
+        server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), make_sink(args.delay, args.fail_rate, received))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = "127.0.0.1", server.server_address[1]
+
+    mailer = MailDispatcher(host=host, port=port or 25, workers=args.workers, batch_size=args.batch_size,
+                            backoff=0.05, max_attempts=6, max_queue=args.messages).start()
+
+    def queue_one(i):
+        started = time.perf_counter()
+        mailer.send(f"user{i}@example.com", "Your verification code", f"Your verification code is {i:06d}.")
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.senders) as pool:
+        enqueue_latencies = list(pool.map(queue_one, range(args.messages)))
+    enqueued = time.perf_counter() - started
+    mailer.flush(timeout=300)
+    elapsed = time.perf_counter() - started
+    mailer.stop()
+    if server is not None:
+        server.shutdown()
+
+    stats = mailer.stats()
+    print(json.dumps({
+        "messages": args.messages,
+        "enqueue_seconds": round(enqueued, 3),
+        "enqueue_us": {q: round(percentile(enqueue_latencies, p) * 1e6, 1)
+                       for q, p in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))},
+        "delivered_per_s": round(stats["sent"] / elapsed, 1),
+        "sent": stats["sent"],
+        "failed": stats["failed"],
+        "retries": stats["retries"],
+        "batches": stats["batches"],
+        "connections_opened": stats["connections_opened"],
+        "send_ms_avg": round(stats["send_seconds_avg"] * 1e3, 2),
+        "delivery_ms_avg": round(stats["delivery_seconds_avg"] * 1e3, 2),
+        "delivery_ms_max": round(stats["delivery_seconds_max"] * 1e3, 2),
+        "sink_received": len(received) if server is not None else None,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""pytest-benchmark microbenchmarks for the request hot paths.
+
+Not collected by a plain ``pytest`` run (the file name doesn't match
+test_*.py); run it explicitly from the repository root:
+
+    python -m pytest benchmarks/bench_micro.py --benchmark-json micro.json
+
+Models are small forests fitted on synthetic data shaped like
+merged_data.csv, so no trained artifacts are needed.
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pytest_benchmark")
+
+import chat_store  # noqa: E402
+import feature_schema  # noqa: E402
+import intent_matcher  # noqa: E402
+import response_cache  # noqa: E402
+from forest_compiler import compile_forest  # noqa: E402
+
+FORM = {"age": "45", "height_cm": "175", "weight_kg": "80", "systolic_bp": "120", "diastolic_bp": "80",
+        "heart_rate": "72", "temperature": "37.0"}
+
+
+@pytest.fixture(scope="module")
+def forest():
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(0)
+    X = rng.normal([45, 67, 165, 125, 80, 72, 98.6], [12, 3, 25, 8, 6, 4, 0.4], size=(2000, 7)).astype(np.float32)
+    y = np.array(["Hypertension", "Diabetes", "Asthma", "Migraine"])[rng.integers(0, 4, size=2000)]
+    model = RandomForestClassifier(n_estimators=100, random_state=0).fit(X, y)
+    return model, compile_forest(model), X
+
+
+def test_assemble_form(benchmark):
+    benchmark(feature_schema.assemble, FORM)
+
+
+def test_assemble_batch(benchmark):
+    benchmark(feature_schema.assemble, [FORM] * 500)
+
+
+def test_inference_single_sklearn(benchmark, forest):
+    model, _, X = forest
+    benchmark(model.predict, X[:1])
+
+
+def test_inference_single_compiled(benchmark, forest):
+    _, compiled, X = forest
+    benchmark(compiled.predict, X[:1])
+
+
+def test_inference_batch_compiled(benchmark, forest):
+    _, compiled, X = forest
+    benchmark(compiled.predict, X[:500])
+
+
+def test_serialize_history_page(benchmark):
+    rows = [{"prediction": "Hypertension", "medication": "Lisinopril", "dosage": "10mg",
+             "created_at": "2026-01-01 12:00:00"}] * 50
+    benchmark(lambda: response_cache.CachedBody(response_cache.serialize(rows)))
+
+
+def test_chat_intent_response(benchmark):
+    matcher = intent_matcher.load_intents()
+    benchmark(matcher.respond, "I've had a bad headache since this morning, what should I do?")
+
+
+def test_chat_history_append_and_context(benchmark):
+    store = chat_store.InMemoryChatStore()
+
+    def turn():
+        store.append("bench", "user", "How much water should I drink every day?")
+        return store.context("bench")
+
+    benchmark(turn)
@@ -0,0 +1,189 @@
+"""HTTP load test for the Flask service: per-endpoint throughput and latency percentiles.
+
+Starts the app in a subprocess from the production entry point (gunicorn via
+main.py, or the threaded werkzeug server with --server dev; working directory
+holding the seeded healthcare.db) or targets a running server with --url,
+then drives each endpoint at fixed concurrency with one pooled HTTP session
+per client thread and prints a JSON report. Seed the database first:
+
+    python benchmarks/seed_db.py --db /tmp/load/healthcare.db --rows 100000
+    python benchmarks/load_test.py --workdir /tmp/load --model-dir backend/models \\
+        --concurrency 16 --requests 2000 --workers 4 --output load_report.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FORM_ROW = {"age": 45, "height_cm": 175, "weight_kg": 80, "systolic_bp": 120, "diastolic_bp": 80,
+            "heart_rate": 72, "temperature": 37.0}
+CHAT_MESSAGES = ["I have a headache", "How much water should I drink?", "Tips for better sleep",
+                 "What is a healthy blood pressure?", "hello", "I feel stressed"]
+
+DEV_SERVER_SCRIPT = """
+import sys
+sys.path.insert(0, {repo!r})
+import app
+from werkzeug.serving import run_simple
+app.init_db()
+run_simple("127.0.0.1", {port}, app.app, threaded=True)
+"""
+
+
+def endpoint_requests(users):
+    """name -> function(session, base_url) issuing one request"""
+    def predict(session, base):
+        row = {key: value * random.uniform(0.9, 1.1) for key, value in FORM_ROW.items()}
+        row["age"] = int(row["age"])
+        return session.post(f"{base}/predict", data=row, headers={"X-Requested-With": "XMLHttpRequest"})
+
+    def dashboard(session, base):
+        return session.get(f"{base}/api/dashboard-data")
+
+    def trends(session, base):
+        return session.get(f"{base}/api/health-trends", params={"period": random.choice(["day", "week", "month"])})
+
+    def history(session, base):
+        return session.get(f"{base}/api/health-history", params={"limit": 50})
+
+    def chat(session, base):
+        return session.post(f"{base}/api/chat", json={"message": random.choice(CHAT_MESSAGES),
+                                                      "user_id": f"load-{random.randint(1, users)}"})
+
+    return {"/predict": predict, "/api/dashboard-data": dashboard, "/api/health-trends": trends,
+            "/api/health-history": history, "/api/chat": chat}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def server_command(server, port, workers):
+    if server == "dev":
+        return [sys.executable, "-c", DEV_SERVER_SCRIPT.format(repo=REPO_ROOT, port=port)]
+    return [sys.executable, os.path.join(REPO_ROOT, "main.py"), "--bind", f"127.0.0.1:{port}",
+            "--workers", str(workers)]
+
+
+def start_server(workdir, model_dir, server="gunicorn", workers=2):
+    port = free_port()
+    env = dict(os.environ, MODEL_DIR=os.path.abspath(model_dir)) if model_dir else dict(os.environ)
+    process = subprocess.Popen(server_command(server, port, workers),
+                               cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(f"{base}/api/health-tips", timeout=1)
+            return process, base
+        except requests.ConnectionError:
+            if process.poll() is not None:
+                raise RuntimeError("App server exited during startup")
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("App server did not start within 60s")
+
+
+def percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_endpoint(base, issue, total, concurrency, warmup):
+    local = threading.local()
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = issue(session, base).status_code < 400
+        except requests.RequestException:
+            ok = False
+        return time.perf_counter() - started, ok
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(warmup)))
+        started = time.perf_counter()
+        results = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": total,
+        "errors": sum(1 for _, ok in results if not ok),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50) * 1e3, 2),
+            "p95": round(percentile(latencies, 0.95) * 1e3, 2),
+            "p99": round(percentile(latencies, 0.99) * 1e3, 2),
+            "mean": round(sum(latencies) / len(latencies) * 1e3, 2),
+            "max": round(latencies[-1] * 1e3, 2),
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--workdir", default=".", help="directory with the seeded healthcare.db (started server only)")
+    parser.add_argument("--model-dir", help="MODEL_DIR for the started server")
+    parser.add_argument("--server", choices=["gunicorn", "dev"], default="gunicorn",
+                        help="started server: main.py under gunicorn, or the werkzeug dev server")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers for the started server")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=50, help="unmeasured requests per endpoint first")
+    parser.add_argument("--endpoints", default="all", help="comma-separated subset, e.g. /predict,/api/chat")
+    parser.add_argument("--users", type=int, default=100, help="distinct chat sessions")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="also write the JSON report here")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    endpoints = endpoint_requests(args.users)
+    if args.endpoints != "all":
+        endpoints = {name: endpoints[name] for name in args.endpoints.split(",")}
+
+    process = None
+    base = args.url.rstrip("/") if args.url else None
+    if base is None:
+        process, base = start_server(args.workdir, args.model_dir, args.server, args.workers)
+    try:
+        results = {name: run_endpoint(base, issue, args.requests, args.concurrency, args.warmup)
+                   for name, issue in endpoints.items()}
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(10)
+
+    report = {
+        "target": args.url or args.server,
+        "concurrency": args.concurrency,
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "endpoints": results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Seed a predictions database with synthetic rows for load testing.
+
+Vitals are drawn per feature from normal distributions fitted to
+merged_data.csv (clipped to a margin around its observed range, stored in
+the table's cm/kg/°C units) and each
+row gets a (disease, medication, dosage) triple sampled from the CSV.
+created_at is spread over the last --days days in insertion order, across
+--users users. The schema, indexes and triggers are the app's own
+(database.migrate), so summary tables are filled as rows go in. Run from the
+repository root:
+
+    python benchmarks/seed_db.py --db /tmp/load/healthcare.db --rows 1000000 --users 1000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database  # noqa: E402
+import feature_schema  # noqa: E402
+import feature_store  # noqa: E402
+from bench_db import SCHEMA  # noqa: E402
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# As prediction_writer.INSERT_PREDICTION_SQL, plus a back-dated created_at
+INSERT_SQL = """
+    INSERT INTO predictions (user_id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature, prediction, medication, dosage, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def load_profile(csv_path):
+    df = pd.read_csv(csv_path)
+    X = feature_store.extract_features(df, dtype=np.float64)
+    labels = df[["disease", "medication_name", "dosage"]].fillna("Unknown").astype(str).to_numpy()
+    return {
+        "mean": np.nanmean(X, axis=0),
+        "std": np.maximum(np.nanstd(X, axis=0), 1e-3),
+        "low": np.nanmin(X, axis=0) * 0.8,
+        "high": np.nanmax(X, axis=0) * 1.2,
+        "labels": labels,
+    }
+
+
+def synthetic_batch(rng, profile, n, users, start, span_seconds):
+    X = rng.normal(profile["mean"], profile["std"], size=(n, len(profile["mean"])))
+    X = feature_schema.to_storage_units(np.clip(X, profile["low"], profile["high"])).round(1)
+    age = X[:, 0].round().astype(int)
+    user_ids = rng.integers(1, users + 1, size=n)
+    labels = profile["labels"][rng.integers(0, len(profile["labels"]), size=n)]
+    offsets = np.sort(rng.uniform(0, span_seconds, size=n))
+    created = [(start + timedelta(seconds=float(s))).strftime("%Y-%m-%d %H:%M:%S") for s in offsets]
+    columns = [user_ids.tolist(), age.tolist(), *(X[:, i].tolist() for i in range(1, X.shape[1])),
+               labels[:, 0].tolist(), labels[:, 1].tolist(), labels[:, 2].tolist(), created]
+    return list(zip(*columns))
+
+
+def seed(db_path, rows, users, days, batch_size=100000, csv_path=None, seed_value=42):
+    profile = load_profile(csv_path or os.path.join(REPO_ROOT, "merged_data.csv"))
+    rng = np.random.default_rng(seed_value)
+    conn = database.connect(db_path, pragmas={**database.PRAGMAS, "synchronous": "OFF"})
+    conn.execute(SCHEMA)
+    conn.commit()
+    database.migrate(conn)
+
+    start = datetime.now() - timedelta(days=days)
+    batches = max(1, -(-rows // batch_size))
+    window = days * 86400 / batches
+    written = 0
+    started = time.perf_counter()
+    for b in range(batches):
+        n = min(batch_size, rows - written)
+        batch = synthetic_batch(rng, profile, n, users, start + timedelta(seconds=b * window), window)
+        conn.executemany(INSERT_SQL, batch)
+        conn.commit()
+        written += n
+        elapsed = time.perf_counter() - started
+        print(f"  {written:>10} rows  {written / elapsed:10.0f} rows/s")
+    conn.execute("ANALYZE")
+    conn.close()
+    return written, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="healthcare.db")
+    parser.add_argument("--rows", type=int, default=10000, help="rows to add (10k to 10M)")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many past days")
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--csv", default=None, help="CSV to fit the vitals distributions to (default merged_data.csv)")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    written, elapsed = seed(args.db, args.rows, args.users, args.days, args.batch_size, args.csv, args.seed)
+    print(f"Seeded {written} rows into {args.db} in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import database
+
+# Chat session storage for /api/chat. Each session keeps a fixed-length ring
+# buffer of messages plus the rendered prompt context for its most recent
+# messages, updated as messages arrive instead of re-joined on every call.
+MAX_MESSAGES = 20
+CONTEXT_MESSAGES = 10
+SESSION_TTL = 30 * 60
+MAX_SESSIONS = 10000
+MAX_BYTES = 64 * 1024 * 1024
+
+
+def render_message(role, content):
+    return f"{role}: {content}"
+
+
+class ChatSession:
+    def __init__(self, max_messages=MAX_MESSAGES, context_messages=CONTEXT_MESSAGES):
+        self.messages = deque(maxlen=max_messages)
+        self.context_lines = deque(maxlen=context_messages)
+        self.context = ""
+        self.nbytes = 0
+        self.last_access = time.monotonic()
+
+    def append(self, role, content):
+        if len(self.messages) == self.messages.maxlen:
+            old = self.messages[0]
+            self.nbytes -= len(old["content"])
+        self.messages.append({"role": role, "content": content})
+        self.nbytes += len(content)
+
+        # Drop the oldest rendered line from the front of the context (if the
+        # window is full) and add the new one at the end
+        line = render_message(role, content)
+        if len(self.context_lines) == self.context_lines.maxlen:
+            dropped = self.context_lines[0]
+            self.context = self.context[len(dropped) + 1:] if len(self.context_lines) > 1 else ""
+        self.context_lines.append(line)
+        self.context = f"{self.context}\n{line}" if len(self.context_lines) > 1 else line
+        self.last_access = time.monotonic()
+
+
+class InMemoryChatStore:
+    """Per-process store: LRU-ordered sessions with TTL, session-count and memory caps"""
+
+    def __init__(self, max_messages=MAX_MESSAGES, context_messages=CONTEXT_MESSAGES,
+                 ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, max_bytes=MAX_BYTES):
+        self.max_messages = max_messages
+        self.context_messages = context_messages
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _evict(self, session_id):
+        session = self._sessions.pop(session_id)
+        self._bytes -= session.nbytes
+        self.evicted += 1
+
+    def _enforce_limits(self):
+        # Oldest-accessed sessions sit at the front of the OrderedDict
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if (now - session.last_access > self.ttl or len(self._sessions) > self.max_sessions
+                    or self._bytes > self.max_bytes):
+                self._evict(session_id)
+            else:
+                break
+
+    def append(self, session_id, role, content):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = self._sessions[session_id] = ChatSession(self.max_messages, self.context_messages)
+            else:
+                self._sessions.move_to_end(session_id)
+            before = session.nbytes
+            session.append(role, content)
+            self._bytes += session.nbytes - before
+            self._enforce_limits()
+
+    def context(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session.context if session else ""
+
+    def history(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return list(session.messages) if session else []
+
+    def clear(self, session_id):
+        with self._lock:
+            if session_id in self._sessions:
+                self._evict(session_id)
+
+    def sweep(self):
+        with self._lock:
+            self._enforce_limits()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "bytes": self._bytes,
+                "evicted": self.evicted,
+            }
+
+
+class SQLiteChatStore:
+    """Store shared by every worker process through SQLite.
+
+    Messages live in ``chat_messages`` (trimmed to the last ``max_messages``
+    per session) and the rendered context is kept in ``chat_sessions`` so a
+    read is a single primary-key lookup.
+    """
+
+    def __init__(self, db_path=None, max_messages=MAX_MESSAGES, context_messages=CONTEXT_MESSAGES,
+                 ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, sweep_interval=60):
+        self.max_messages = max_messages
+        self.context_messages = context_messages
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._pool = database.ConnectionPool(db_path)
+        self._last_sweep = time.monotonic()
+        self._create_tables()
+
+    def _create_tables(self):
+        conn = self._pool.get()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT PRIMARY KEY,
+                context TEXT NOT NULL DEFAULT '',
+                context_count INTEGER NOT NULL DEFAULT 0,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_access ON chat_sessions (last_access);
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_chat_messages_session ON chat_messages (session_id, id);
+        """)
+
+    def append(self, session_id, role, content):
+        session_id = str(session_id)
+        line = render_message(role, content)
+        conn = self._pool.get()
+        with conn:
+            # BEGIN IMMEDIATE so two workers can't both read the same context and
+            # overwrite each other's line
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT context, context_count FROM chat_sessions WHERE session_id=?", (session_id,)
+            ).fetchone()
+            context, count = (row["context"], row["context_count"]) if row else ("", 0)
+
+            if count >= self.context_messages:
+                # Window is full: drop the oldest context line (content may span lines,
+                # so the line being dropped is re-rendered from the message table)
+                oldest = conn.execute("""
+                    SELECT role, content FROM chat_messages WHERE session_id=?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                """, (session_id, self.context_messages - 1)).fetchone()
+                if oldest is not None:
+                    context = context[len(render_message(oldest["role"], oldest["content"])) + 1:]
+                count -= 1
+            context = f"{context}\n{line}" if count else line
+            count += 1
+
+            conn.execute("INSERT INTO chat_messages (session_id, role, content) VALUES (?, ?, ?)",
+                         (session_id, role, content))
+            conn.execute("""
+                INSERT INTO chat_sessions (session_id, context, context_count, last_access) VALUES (?, ?, ?, ?)
+                ON CONFLICT (session_id) DO UPDATE SET
+                    context=excluded.context, context_count=excluded.context_count, last_access=excluded.last_access
+            """, (session_id, context, count, time.time()))
+            # Ring buffer: keep only the newest max_messages rows for the session
+            conn.execute("""
+                DELETE FROM chat_messages WHERE session_id=? AND id <= (
+                    SELECT id FROM chat_messages WHERE session_id=? ORDER BY id DESC LIMIT 1 OFFSET ?
+                )
+            """, (session_id, session_id, self.max_messages))
+
+        if time.monotonic() - self._last_sweep > self.sweep_interval:
+            self.sweep()
+
+    def context(self, session_id):
+        row = self._pool.get().execute(
+            "SELECT context FROM chat_sessions WHERE session_id=?", (str(session_id),)
+        ).fetchone()
+        return row["context"] if row else ""
+
+    def history(self, session_id):
+        rows = self._pool.get().execute(
+            "SELECT role, content FROM chat_messages WHERE session_id=? ORDER BY id", (str(session_id),)
+        ).fetchall()
+        return [{"role": row["role"], "content": row["content"]} for row in rows]
+
+    def clear(self, session_id):
+        conn = self._pool.get()
+        with conn:
+            conn.execute("DELETE FROM chat_messages WHERE session_id=?", (str(session_id),))
+            conn.execute("DELETE FROM chat_sessions WHERE session_id=?", (str(session_id),))
+
+    def sweep(self):
+        """Delete idle sessions and, past max_sessions, the least recently used ones"""
+        self._last_sweep = time.monotonic()
+        conn = self._pool.get()
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS expired_sessions (session_id TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM expired_sessions")
+            conn.execute("INSERT INTO expired_sessions SELECT session_id FROM chat_sessions WHERE last_access < ?",
+                         (time.time() - self.ttl,))
+            conn.execute("""
+                INSERT OR IGNORE INTO expired_sessions
+                SELECT session_id FROM chat_sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            """, (self.max_sessions,))
+            conn.execute("DELETE FROM chat_messages WHERE session_id IN (SELECT session_id FROM expired_sessions)")
+            conn.execute("DELETE FROM chat_sessions WHERE session_id IN (SELECT session_id FROM expired_sessions)")
+
+    def stats(self):
+        conn = self._pool.get()
+        sessions = conn.execute("SELECT COUNT(*) FROM chat_sessions").fetchone()[0]
+        messages, nbytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM chat_messages").fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "messages": messages,
+            "bytes": nbytes,
+        }
+
+
+def create_store():
+    """Chat store selected by CHAT_STORE (memory or sqlite) and CHAT_DB_PATH"""
+    backend = os.environ.get("CHAT_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteChatStore(os.environ.get("CHAT_DB_PATH") or None)
+    if backend != "memory":
+        raise ValueError(f"Unknown CHAT_STORE backend: {backend}")
+    return InMemoryChatStore()
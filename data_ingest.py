@@ -0,0 +1,89 @@
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import feature_store
+from feature_store import FEATURES, TARGETS
+
+# Streaming import of merged_data.csv into the feature store's ``csv``
+# partition: read only the columns training uses, in chunks with compact
+# dtypes, so later runs memory-map typed columns instead of parsing the CSV.
+CACHE_VERSION = 2
+DEFAULT_CHUNKSIZE = 1_000_000
+
+CSV_DTYPES = {
+    'age': 'float32',
+    'height': 'float32',
+    'weight': 'float32',
+    'heart_rate': 'float32',
+    'temperature': 'float32',
+    'blood_pressure': 'string',
+    'disease': 'category',
+    'medication_name': 'category',
+    'dosage': 'category',
+}
+
+
+def content_hash(csv_path):
+    digest = hashlib.sha256()
+    with open(csv_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_signature(csv_path):
+    # Size and mtime are enough to notice a re-export without reading the file
+    stat = os.stat(csv_path)
+    return {'path': os.path.abspath(csv_path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+            'version': CACHE_VERSION}
+
+
+def import_is_fresh(store, csv_path):
+    meta = store.tables['csv'].meta()
+    return meta.get('complete') and meta.get('source') == source_signature(csv_path)
+
+
+def ingest_csv(csv_path, store, chunksize=DEFAULT_CHUNKSIZE):
+    """Stream the CSV into the store's csv partition (replacing it) and return the number of rows written"""
+    table = store.tables['csv']
+    table.reset(complete=False)
+
+    rows = 0
+    reader = pd.read_csv(csv_path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES, chunksize=chunksize)
+    for chunk in reader:
+        # Chunks are appended to the column files as they arrive, so memory
+        # use is bounded by the chunk size, not the CSV size
+        matrix = feature_store.extract_features(chunk)
+        columns = {feature: matrix[:, i] for i, feature in enumerate(FEATURES)}
+        rows += table.append(columns, {target: chunk[target] for target in TARGETS})
+
+    # Marked complete last so an interrupted import is never treated as fresh
+    table.append({feature: np.empty(0, np.float32) for feature in FEATURES},
+                 source=source_signature(csv_path), sha256=content_hash(csv_path), complete=True)
+    return rows
+
+
+def target_labels(categorical):
+    """Plain string label array for sklearn (missing values become empty strings)"""
+    labels = np.append(np.asarray(categorical.categories, dtype=str), '')
+    return labels[np.asarray(categorical.codes)]
+
+
+def ensure_imported(csv_path, store, chunksize=DEFAULT_CHUNKSIZE):
+    """Re-import csv_path into the store only when the CSV changed"""
+    if import_is_fresh(store, csv_path):
+        print(f"Using imported features: {store.tables['csv'].path}")
+    else:
+        rows = ingest_csv(csv_path, store, chunksize=chunksize)
+        print(f"Imported {rows} rows from {csv_path} into {store.tables['csv'].path}")
+    return store.tables['csv'].meta()
+
+
+def load_training_data(csv_path, store_dir, chunksize=DEFAULT_CHUNKSIZE):
+    """Features and targets for csv_path, see FeatureStore.load"""
+    store = feature_store.FeatureStore(store_dir)
+    ensure_imported(csv_path, store, chunksize=chunksize)
+    return store.load()
@@ -0,0 +1,386 @@
+import atexit
+import os
+import sqlite3
+import threading
+import weakref
+
+# SQLite connection management: one connection per thread per request, reused
+# through a small idle list, WAL journal mode so readers don't block on /predict writes.
+DB_PATH = "healthcare.db"
+
+# Size of sqlite3's per-connection prepared statement cache
+STATEMENT_CACHE_SIZE = 256
+
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",     # safe with WAL, avoids an fsync per commit
+    "cache_size": -16000,        # negative value = KiB, so ~16 MB page cache
+    "mmap_size": 268435456,      # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms to wait on a locked database
+}
+
+
+def connect(db_path=None, pragmas=None):
+    """Open a new tuned connection (callers own it and must close it)"""
+    conn = sqlite3.connect(
+        db_path or DB_PATH,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row  # This enables name-based access to columns
+    for name, value in (pragmas or PRAGMAS).items():
+        conn.execute(f"PRAGMA {name}={value}")
+    return conn
+
+
+# Every live pool (the app's, the chat and OTP stores'), so request teardown
+# and a forking server can reach all of them
+_pools = weakref.WeakSet()
+
+# Connections kept open between requests per pool; more than this many
+# request threads at once open extra connections that are closed on release
+MAX_IDLE = int(os.environ.get("DB_POOL_MAX_IDLE", "16"))
+
+# Greenlet workers (gevent) run each request on a new greenlet, and
+# threading.local is per greenlet there: close the request's connections on
+# teardown instead of keeping one per "thread" forever
+CLOSE_ON_TEARDOWN = os.environ.get("DB_CLOSE_ON_TEARDOWN", "0").lower() in ("1", "true", "yes")
+
+
+class ConnectionPool:
+    """Hands out one connection per thread for the length of a request.
+
+    release() takes the thread's connection back into a bounded idle list,
+    so servers that start a thread per request (werkzeug's threaded dev
+    server) reuse a few connections instead of leaving one open per thread.
+    Threads that never release (background workers) keep theirs.
+    """
+
+    def __init__(self, db_path=None, pragmas=None, max_idle=None):
+        self.db_path = db_path or DB_PATH
+        self.pragmas = pragmas or PRAGMAS
+        self.max_idle = MAX_IDLE if max_idle is None else max_idle
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = set()
+        self._idle = []
+        self.opened = 0
+        self.reused = 0
+        _pools.add(self)
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self.reused += 1
+            return conn
+
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+            if conn is not None:
+                self.reused += 1
+        if conn is None:
+            conn = connect(self.db_path, self.pragmas)
+            with self._lock:
+                self._connections.add(conn)
+                self.opened += 1
+        self._local.conn = conn
+        return conn
+
+    def release(self):
+        # End of a request: drop any uncommitted work and hand the connection
+        # back to the idle list (closing it when the list is full)
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if conn in self._connections and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+            self._connections.discard(conn)
+        conn.close()
+
+    def close_thread(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._lock:
+            self._connections.discard(conn)
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections = list(self._connections)
+            self._connections.clear()
+            self._idle.clear()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def stats(self):
+        with self._lock:
+            open_connections = len(self._connections)
+            idle = len(self._idle)
+        return {
+            "db_path": self.db_path,
+            "open_connections": open_connections,
+            "idle_connections": idle,
+            "opened": self.opened,
+            "reused": self.reused,
+        }
+
+
+# Schema migrations, applied in order on top of the base tables created by
+# init_db(). PRAGMA user_version records how many have been applied.
+MIGRATIONS = [
+    # 1: composite index for per-user history queries and a per-user summary
+    # table kept current by a trigger, so dashboards don't aggregate history
+    """
+    CREATE INDEX IF NOT EXISTS idx_predictions_user_created
+        ON predictions (user_id, created_at);
+
+    CREATE TABLE IF NOT EXISTS user_prediction_stats (
+        user_id INTEGER PRIMARY KEY,
+        total_predictions INTEGER NOT NULL DEFAULT 0,
+        last_prediction TIMESTAMP,
+        latest_condition TEXT
+    );
+
+    INSERT OR REPLACE INTO user_prediction_stats (user_id, total_predictions, last_prediction, latest_condition)
+    SELECT p.user_id,
+           COUNT(*),
+           MAX(p.created_at),
+           (SELECT latest.prediction FROM predictions latest
+            WHERE latest.user_id = p.user_id
+            ORDER BY latest.created_at DESC, latest.id DESC LIMIT 1)
+    FROM predictions p
+    GROUP BY p.user_id;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_stats_insert
+    AFTER INSERT ON predictions
+    BEGIN
+        INSERT INTO user_prediction_stats (user_id, total_predictions, last_prediction, latest_condition)
+        VALUES (NEW.user_id, 1, NEW.created_at, NEW.prediction)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_predictions = total_predictions + 1,
+            latest_condition = CASE
+                WHEN last_prediction IS NULL OR excluded.last_prediction >= last_prediction
+                THEN excluded.latest_condition ELSE latest_condition END,
+            last_prediction = CASE
+                WHEN last_prediction IS NULL OR excluded.last_prediction >= last_prediction
+                THEN excluded.last_prediction ELSE last_prediction END;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_stats_delete
+    AFTER DELETE ON predictions
+    BEGIN
+        UPDATE user_prediction_stats SET total_predictions = total_predictions - 1
+        WHERE user_id = OLD.user_id;
+    END;
+    """,
+    # 2: per-user day/week/month rollups of vitals and predicted conditions for
+    # the trends API. prediction_rollup_rows expands a prediction into its three
+    # buckets (temperature normalized to °C, "normal" = BP < 130/85, HR 60-100,
+    # 36.1-37.5 °C); the triggers fold one row in (or out, negated) by id, so a
+    # trend chart reads one rollup row per bucket instead of scanning history.
+    """
+    CREATE TABLE IF NOT EXISTS prediction_rollups (
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        samples INTEGER NOT NULL DEFAULT 0,
+        normal_samples INTEGER NOT NULL DEFAULT 0,
+        systolic_sum REAL NOT NULL DEFAULT 0,
+        systolic_count INTEGER NOT NULL DEFAULT 0,
+        diastolic_sum REAL NOT NULL DEFAULT 0,
+        diastolic_count INTEGER NOT NULL DEFAULT 0,
+        heart_rate_sum REAL NOT NULL DEFAULT 0,
+        heart_rate_count INTEGER NOT NULL DEFAULT 0,
+        temperature_sum REAL NOT NULL DEFAULT 0,
+        temperature_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, period, bucket)
+    ) WITHOUT ROWID;
+
+    CREATE TABLE IF NOT EXISTS prediction_condition_rollups (
+        user_id INTEGER NOT NULL,
+        period TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        condition TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (user_id, period, bucket, condition)
+    ) WITHOUT ROWID;
+
+    CREATE VIEW IF NOT EXISTS prediction_rollup_rows AS
+    SELECT r.id, r.user_id, r.period, r.bucket, r.prediction,
+           r.systolic_bp, r.diastolic_bp, r.heart_rate, r.temperature,
+           COALESCE(r.systolic_bp < 130 AND r.diastolic_bp < 85
+                    AND r.heart_rate BETWEEN 60 AND 100
+                    AND r.temperature BETWEEN 36.1 AND 37.5, 0) AS normal
+    FROM (
+        SELECT p.id, p.user_id, periods.period,
+               CASE periods.period
+                   WHEN 'day' THEN date(p.created_at)
+                   WHEN 'week' THEN date(p.created_at, 'weekday 0', '-6 days')
+                   ELSE strftime('%Y-%m', p.created_at)
+               END AS bucket,
+               p.prediction, p.systolic_bp, p.diastolic_bp, p.heart_rate,
+               CASE WHEN p.temperature > 50 THEN (p.temperature - 32) / 1.8 ELSE p.temperature END AS temperature
+        FROM predictions p
+        CROSS JOIN (SELECT 'day' AS period UNION ALL SELECT 'week' UNION ALL SELECT 'month') periods
+    ) r
+    WHERE r.bucket IS NOT NULL;
+
+    INSERT OR REPLACE INTO prediction_rollups
+    SELECT user_id, period, bucket, COUNT(*), SUM(normal),
+           TOTAL(systolic_bp), COUNT(systolic_bp), TOTAL(diastolic_bp), COUNT(diastolic_bp),
+           TOTAL(heart_rate), COUNT(heart_rate), TOTAL(temperature), COUNT(temperature)
+    FROM prediction_rollup_rows
+    GROUP BY user_id, period, bucket;
+
+    INSERT OR REPLACE INTO prediction_condition_rollups
+    SELECT user_id, period, bucket, prediction, COUNT(*)
+    FROM prediction_rollup_rows
+    WHERE prediction IS NOT NULL
+    GROUP BY user_id, period, bucket, prediction;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_rollup_insert
+    AFTER INSERT ON predictions
+    BEGIN
+        INSERT INTO prediction_rollups
+        SELECT user_id, period, bucket, 1, normal,
+               COALESCE(systolic_bp, 0), systolic_bp IS NOT NULL, COALESCE(diastolic_bp, 0), diastolic_bp IS NOT NULL,
+               COALESCE(heart_rate, 0), heart_rate IS NOT NULL, COALESCE(temperature, 0), temperature IS NOT NULL
+        FROM prediction_rollup_rows WHERE id = NEW.id
+        ON CONFLICT (user_id, period, bucket) DO UPDATE SET
+            samples = samples + excluded.samples,
+            normal_samples = normal_samples + excluded.normal_samples,
+            systolic_sum = systolic_sum + excluded.systolic_sum,
+            systolic_count = systolic_count + excluded.systolic_count,
+            diastolic_sum = diastolic_sum + excluded.diastolic_sum,
+            diastolic_count = diastolic_count + excluded.diastolic_count,
+            heart_rate_sum = heart_rate_sum + excluded.heart_rate_sum,
+            heart_rate_count = heart_rate_count + excluded.heart_rate_count,
+            temperature_sum = temperature_sum + excluded.temperature_sum,
+            temperature_count = temperature_count + excluded.temperature_count;
+
+        INSERT INTO prediction_condition_rollups
+        SELECT user_id, period, bucket, prediction, 1
+        FROM prediction_rollup_rows WHERE id = NEW.id AND prediction IS NOT NULL
+        ON CONFLICT (user_id, period, bucket, condition) DO UPDATE SET count = count + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_rollup_delete
+    BEFORE DELETE ON predictions
+    BEGIN
+        UPDATE prediction_rollups SET
+            samples = samples - 1,
+            normal_samples = normal_samples - r.normal,
+            systolic_sum = systolic_sum - COALESCE(r.systolic_bp, 0),
+            systolic_count = systolic_count - (r.systolic_bp IS NOT NULL),
+            diastolic_sum = diastolic_sum - COALESCE(r.diastolic_bp, 0),
+            diastolic_count = diastolic_count - (r.diastolic_bp IS NOT NULL),
+            heart_rate_sum = heart_rate_sum - COALESCE(r.heart_rate, 0),
+            heart_rate_count = heart_rate_count - (r.heart_rate IS NOT NULL),
+            temperature_sum = temperature_sum - COALESCE(r.temperature, 0),
+            temperature_count = temperature_count - (r.temperature IS NOT NULL)
+        FROM (SELECT * FROM prediction_rollup_rows WHERE id = OLD.id) r
+        WHERE prediction_rollups.user_id = r.user_id
+          AND prediction_rollups.period = r.period
+          AND prediction_rollups.bucket = r.bucket;
+
+        UPDATE prediction_condition_rollups SET count = count - 1
+        FROM (SELECT * FROM prediction_rollup_rows WHERE id = OLD.id) r
+        WHERE prediction_condition_rollups.user_id = r.user_id
+          AND prediction_condition_rollups.period = r.period
+          AND prediction_condition_rollups.bucket = r.bucket
+          AND prediction_condition_rollups.condition = r.prediction;
+    END;
+    """,
+    # 3: deletes also move last_prediction/latest_condition back to the user's
+    # newest remaining prediction (an index seek on idx_predictions_user_created);
+    # the stats of existing users are recomputed once in case rows were deleted
+    """
+    DROP TRIGGER IF EXISTS trg_predictions_stats_delete;
+
+    CREATE TRIGGER trg_predictions_stats_delete
+    AFTER DELETE ON predictions
+    BEGIN
+        UPDATE user_prediction_stats SET
+            total_predictions = total_predictions - 1,
+            last_prediction = (SELECT MAX(created_at) FROM predictions WHERE user_id = OLD.user_id),
+            latest_condition = (SELECT latest.prediction FROM predictions latest
+                                WHERE latest.user_id = OLD.user_id
+                                ORDER BY latest.created_at DESC, latest.id DESC LIMIT 1)
+        WHERE user_id = OLD.user_id;
+    END;
+
+    UPDATE user_prediction_stats SET
+        last_prediction = (SELECT MAX(created_at) FROM predictions WHERE user_id = user_prediction_stats.user_id),
+        latest_condition = (SELECT latest.prediction FROM predictions latest
+                            WHERE latest.user_id = user_prediction_stats.user_id
+                            ORDER BY latest.created_at DESC, latest.id DESC LIMIT 1);
+    """,
+    # 4: a per-user version bumped by every insert and delete, which the
+    # response cache reads by primary key to spot changes made by other
+    # processes. The insert trigger upserts, as it may fire before the stats one
+    """
+    ALTER TABLE user_prediction_stats ADD COLUMN version INTEGER NOT NULL DEFAULT 0;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_version_insert
+    AFTER INSERT ON predictions
+    BEGIN
+        INSERT INTO user_prediction_stats (user_id, version) VALUES (NEW.user_id, 1)
+        ON CONFLICT (user_id) DO UPDATE SET version = version + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS trg_predictions_version_delete
+    AFTER DELETE ON predictions
+    BEGIN
+        UPDATE user_prediction_stats SET version = version + 1 WHERE user_id = OLD.user_id;
+    END;
+    """,
+]
+
+
+def migrate(conn):
+    """Apply any schema migrations the database hasn't seen yet"""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+        conn.executescript(f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;")
+        print(f"Applied database migration {number}")
+    return len(MIGRATIONS)
+
+
+pool = ConnectionPool()
+atexit.register(pool.close_all)
+
+
+def get_connection():
+    return pool.get()
+
+
+def close_pools():
+    """Close every pool's connections, e.g. in a server master before it forks workers"""
+    for each in list(_pools):
+        each.close_all()
+
+
+def init_app(app):
+    """Release the request's connections when the Flask app context tears down"""
+
+    @app.teardown_appcontext
+    def release_db_connection(exception=None):
+        for each in list(_pools):
+            if CLOSE_ON_TEARDOWN:
+                each.close_thread()
+            else:
+                each.release()
+
+    return app
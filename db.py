@@ -1,51 +1,252 @@
-import pandas as pd
-import pymysql
+"""Extract patients, medications and conditions from MySQL into merged_data.csv.
+
+Runs without prompting (connection settings come from MYSQL_* environment
+variables) and streams the patients table through a server-side cursor in
+fixed-size chunks. Each chunk is left-joined to its medications and conditions
+rows, which are fetched by patient_id, and appended to the CSV. A high-water
+mark stored next to the CSV means later runs only extract patients that are new,
+or changed when --watermark names an updated-at column. New patients are
+appended (the mark is saved after each chunk, so a failed run resumes where it
+stopped); with an updated-at watermark a changed patient's earlier rows are
+dropped, by rewriting the CSV once the run has finished, so each patient_id
+only carries its latest version. --sqlite runs the same extract against a
+local SQLite copy of the three tables.
+
+    MYSQL_PASSWORD=... python db.py                 # incremental
+    python db.py --full                             # rebuild from scratch
+    python db.py --sqlite healthcare_src.db --chunksize 5000
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import time
 from getpass import getpass
-import warnings
-warnings.filterwarnings("ignore", category=UserWarning, module="pandas")
-
-password = getpass("Enter MySQL password: ")
-
-# Connect to MySQL
-conn = pymysql.connect(
-    host="localhost",
-    user="root",
-    password=password,
-    database="healthcareproject"
-)
-
-cursor = conn.cursor()
-
-# 1️⃣ Show all tables
-cursor.execute("SHOW TABLES")
-print("Tables in database:")
-for table in cursor.fetchall():
-    print(table)
-
-# 2️⃣ Load patients into pandas
-patients_df = pd.read_sql("SELECT * FROM patients", conn)
-print("\nPatients DataFrame preview:")
-print(patients_df.head())
-
-# Load medications into pandas
-medications_df = pd.read_sql("SELECT * FROM medications", conn)
-print("\nMedications DataFrame preview:")
-print(medications_df.head())
-
-# Load conditions into pandas
-conditions_df = pd.read_sql("SELECT * FROM conditions", conn)
-print("\nConditions DataFrame preview:")
-print(conditions_df.head())
-
-# Merge DataFrames
-merged_df = pd.merge(patients_df, medications_df, on="patient_id", how="left")
-merged_df = pd.merge(merged_df, conditions_df, on="patient_id", how="left")
-print("\nMerged DataFrame preview:")
-print(merged_df.head())
-
-# Save merged DataFrame to CSV
-merged_df.to_csv("merged_data.csv", index=False)
-
-# Close connection
-cursor.close()
-conn.close()
\ No newline at end of file
+
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 10000
+CHILD_TABLES = ("medications", "conditions")
+
+
+def connect_mysql():
+    import pymysql
+    import pymysql.cursors
+
+    password = os.environ.get("MYSQL_PASSWORD")
+    if password is None and sys.stdin.isatty():
+        password = getpass("Enter MySQL password: ")
+    return pymysql.connect(
+        host=os.environ.get("MYSQL_HOST", "localhost"),
+        port=int(os.environ.get("MYSQL_PORT", "3306")),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=password or "",
+        database=os.environ.get("MYSQL_DATABASE", "healthcareproject"),
+    )
+
+
+class Source:
+    """Connections to the source database plus its placeholder style"""
+
+    def __init__(self, sqlite_path=None):
+        self.sqlite_path = sqlite_path
+        if sqlite_path:
+            self.placeholder = "?"
+            self.stream_conn = sqlite3.connect(sqlite_path)
+            self.lookup_conn = sqlite3.connect(sqlite_path)
+        else:
+            # A server-side (unbuffered) cursor ties up its connection until the
+            # result is consumed, so child lookups go through a second one
+            self.placeholder = "%s"
+            self.stream_conn = connect_mysql()
+            self.lookup_conn = connect_mysql()
+
+    def stream_cursor(self):
+        if self.sqlite_path:
+            # sqlite3 cursors already step through results lazily
+            return self.stream_conn.cursor()
+        import pymysql.cursors
+        return self.stream_conn.cursor(pymysql.cursors.SSCursor)
+
+    def close(self):
+        self.stream_conn.close()
+        self.lookup_conn.close()
+
+
+def fetch_frame(cursor):
+    return pd.DataFrame.from_records(cursor.fetchall(), columns=[col[0] for col in cursor.description])
+
+
+def stream_patients(source, watermark, since, chunksize):
+    """Yield DataFrames of patients past the high-water mark, ordered by it"""
+    ph = source.placeholder
+    if watermark == "patient_id":
+        order = "patient_id"
+        where, params = ("WHERE patient_id > " + ph, [since["patient_id"]]) if since else ("", [])
+    else:
+        # Rows sharing an updated-at value are told apart by patient_id
+        order = f"{watermark}, patient_id"
+        where, params = "", []
+        if since:
+            where = f"WHERE {watermark} > {ph} OR ({watermark} = {ph} AND patient_id > {ph})"
+            params = [since[watermark], since[watermark], since["patient_id"]]
+    cursor = source.stream_cursor()
+    try:
+        cursor.execute(f"SELECT * FROM patients {where} ORDER BY {order}", params)
+        columns = [col[0] for col in cursor.description]
+        while True:
+            rows = cursor.fetchmany(chunksize)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+
+def fetch_children(source, table, patient_ids):
+    ph = ", ".join([source.placeholder] * len(patient_ids))
+    cursor = source.lookup_conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table} WHERE patient_id IN ({ph})", patient_ids)
+        return fetch_frame(cursor)
+    finally:
+        cursor.close()
+
+
+def merge_chunk(source, patients_df):
+    ids = patients_df["patient_id"].tolist()
+    merged_df = patients_df
+    for table in CHILD_TABLES:
+        merged_df = pd.merge(merged_df, fetch_children(source, table, ids), on="patient_id", how="left")
+    return merged_df
+
+
+def plain(value):
+    # NumPy/pandas scalars -> JSON-friendly Python values that compare correctly in SQL
+    if hasattr(value, "item"):
+        value = value.item()
+    return value if isinstance(value, (int, float, str)) else str(value)
+
+
+def state_path(output):
+    return output + ".state.json"
+
+
+def load_state(output):
+    path = state_path(output)
+    if not os.path.exists(path) or not os.path.exists(output):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_state(output, state):
+    tmp = state_path(output) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp, state_path(output))
+
+
+def extract_state(watermark, high_water, columns):
+    return {
+        "watermark": watermark,
+        "high_water": high_water,
+        "columns": columns,
+        "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def replace_patients(output, new_rows, patient_ids, chunksize=DEFAULT_CHUNKSIZE):
+    """Rewrite output without the rows of patient_ids, followed by the rows in new_rows"""
+    ids = {str(patient_id) for patient_id in patient_ids}
+    tmp = output + ".tmp"
+    with open(tmp, "w", newline="") as out:
+        header = True
+        # Read as text so the kept rows are written back unchanged
+        for chunk in pd.read_csv(output, chunksize=chunksize, dtype=str, keep_default_na=False):
+            chunk[~chunk["patient_id"].isin(ids)].to_csv(out, header=header, index=False)
+            header = False
+        with open(new_rows, newline="") as f:
+            shutil.copyfileobj(f, out)
+    os.replace(tmp, output)
+    os.remove(new_rows)
+
+
+def run_extract(source, output, watermark="patient_id", chunksize=DEFAULT_CHUNKSIZE, full=False):
+    state = None if full else load_state(output)
+    if state is not None and state.get("watermark") != watermark:
+        print(f"Watermark changed from {state.get('watermark')} to {watermark}, rebuilding {output}")
+        state = None
+    columns = state["columns"] if state else None
+    since = state["high_water"] if state else None
+
+    # A rebuild goes to a temporary file so a failed run leaves the old CSV in
+    # place; so do changed patients, which replace their rows once the run ends
+    updates = state is not None and watermark != "patient_id"
+    target = output + ".new" if updates else output if state else output + ".tmp"
+    if target != output and os.path.exists(target):
+        os.remove(target)
+
+    started = time.perf_counter()
+    rows = 0
+    chunks = 0
+    high_water = since
+    extracted = set()
+    for patients_df in stream_patients(source, watermark, since, chunksize):
+        merged_df = merge_chunk(source, patients_df)
+        if columns is None:
+            columns = list(merged_df.columns)
+        else:
+            # Keep the CSV layout fixed across runs
+            merged_df = merged_df.reindex(columns=columns)
+        merged_df.to_csv(target, mode="a", header=(chunks == 0 and not state), index=False)
+        last = patients_df.iloc[-1]
+        high_water = {"patient_id": plain(last["patient_id"])}
+        if watermark != "patient_id":
+            high_water[watermark] = plain(last[watermark])
+        if updates:
+            extracted.update(plain(patient_id) for patient_id in patients_df["patient_id"])
+        elif state:
+            # Rows arrive in watermark order, so recording the mark after each
+            # appended chunk lets a failed run resume without duplicating rows
+            save_state(output, extract_state(watermark, high_water, columns))
+        rows += len(merged_df)
+        chunks += 1
+        print(f"  chunk {chunks}: {len(patients_df)} patients -> {len(merged_df)} rows")
+
+    if not state:
+        if chunks == 0:
+            print("No patients found")
+            return 0
+        os.replace(target, output)
+        save_state(output, extract_state(watermark, high_water, columns))
+    elif updates and chunks:
+        replace_patients(output, target, extracted, chunksize)
+        save_state(output, extract_state(watermark, high_water, columns))
+    mode = "updated" if updates else "appended to" if state else "wrote"
+    print(f"{mode} {output}: {rows} rows in {chunks} chunks ({time.perf_counter() - started:.2f}s), "
+          f"high-water mark {high_water}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", default="merged_data.csv")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--watermark", default="patient_id",
+                        help="patient_id (append new patients) or an updated-at column of patients (also replace changed ones)")
+    parser.add_argument("--full", action="store_true", help="ignore the high-water mark and rebuild the CSV")
+    parser.add_argument("--sqlite", help="read from this SQLite database instead of MySQL")
+    args = parser.parse_args()
+
+    source = Source(args.sqlite)
+    try:
+        run_extract(source, args.output, watermark=args.watermark, chunksize=args.chunksize, full=args.full)
+    finally:
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
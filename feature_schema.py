@@ -0,0 +1,278 @@
+"""Declared schema for the seven model features: units, ranges, dtypes.
+
+Models are trained on merged_data.csv, which records height in inches,
+weight in lb and temperature in °F; the prediction form and the predictions
+table use cm, kg and °C. Each input column name carries its unit (SOURCES),
+values are converted to the training units on the way in and back to the
+storage units on the way to the database.
+
+assemble() turns raw records (one mapping, a list of dicts or a DataFrame)
+into a feature matrix in training order and checks every row against RANGES
+in one vectorized pass; rows with errors must not reach the models or the
+predictions table. A single mapping (a form post) is parsed without pandas.
+"""
+from collections.abc import Mapping
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['age', 'height', 'weight', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature']
+
+# Training units (merged_data.csv)
+UNITS = {
+    'age': 'years',
+    'height': 'in',
+    'weight': 'lb',
+    'systolic_bp': 'mmHg',
+    'diastolic_bp': 'mmHg',
+    'heart_rate': 'bpm',
+    'temperature': '°F',
+}
+
+# Plausible physiological ranges in training units, inclusive
+RANGES = {
+    'age': (1, 120),
+    'height': (20, 100),          # ~50-254 cm
+    'weight': (4, 660),           # ~2-300 kg
+    'systolic_bp': (60, 260),
+    'diastolic_bp': (30, 160),
+    'heart_rate': (25, 250),
+    'temperature': (90, 110),     # ~32-43 °C
+}
+
+# Input columns for each feature and the unit they arrive in, in order of
+# preference: each row takes its value from the first one it has a value in.
+# "auto" temperatures are °C up to CELSIUS_MAX and °F above (the form sends °C,
+# the CSV °F; no body temperature is plausible in both).
+SOURCES = {
+    'age': (('age', 'years'),),
+    'height': (('height', 'in'), ('height_cm', 'cm')),
+    'weight': (('weight', 'lb'), ('weight_kg', 'kg')),
+    'systolic_bp': (('systolic_bp', 'mmHg'),),
+    'diastolic_bp': (('diastolic_bp', 'mmHg'),),
+    'heart_rate': (('heart_rate', 'bpm'),),
+    'temperature': (('temperature', 'auto'), ('temperature_f', '°F'), ('temperature_c', '°C')),
+}
+CELSIUS_MAX = 50.0
+
+# predictions table columns: unit and dtype each feature is stored with
+STORAGE = {
+    'age': ('years', int),
+    'height': ('cm', float),
+    'weight': ('kg', float),
+    'systolic_bp': ('mmHg', float),
+    'diastolic_bp': ('mmHg', float),
+    'heart_rate': ('bpm', float),
+    'temperature': ('°C', float),
+}
+
+CM_PER_INCH = 2.54
+LB_PER_KG = 2.20462262
+
+TO_TRAINING = {
+    'cm': lambda v: v / CM_PER_INCH,
+    'kg': lambda v: v * LB_PER_KG,
+    '°C': lambda v: v * 1.8 + 32.0,
+    'auto': lambda v: np.where(v <= CELSIUS_MAX, v * 1.8 + 32.0, v),
+}
+FROM_TRAINING = {
+    'cm': lambda v: v * CM_PER_INCH,
+    'kg': lambda v: v / LB_PER_KG,
+    '°C': lambda v: (v - 32.0) / 1.8,
+}
+
+LOW = np.array([RANGES[feature][0] for feature in FEATURES], dtype=np.float64)
+HIGH = np.array([RANGES[feature][1] for feature in FEATURES], dtype=np.float64)
+SYSTOLIC, DIASTOLIC = FEATURES.index('systolic_bp'), FEATURES.index('diastolic_bp')
+
+
+class FeatureValidationError(ValueError):
+    """Raised by validate(); errors maps row index -> list of messages"""
+
+    def __init__(self, errors):
+        self.errors = errors
+        first = next(iter(errors.values()))
+        super().__init__("; ".join(first))
+
+
+def parse_blood_pressure(bp):
+    """Split "120/80" strings into float systolic and diastolic arrays in one pass"""
+    parts = pd.Series(bp, dtype='string').str.partition('/')
+    systolic = pd.to_numeric(parts[0], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    diastolic = pd.to_numeric(parts[2], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return systolic, diastolic
+
+
+def to_float(value):
+    """float, None when blank/missing, NaN when not a number"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not value:
+            return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def parse_column(values):
+    """(float64 numbers, present mask) for one input column, a Series or a list"""
+    if isinstance(values, pd.Series):
+        if pd.api.types.is_numeric_dtype(values):
+            numbers = values.to_numpy(dtype=np.float64, na_value=np.nan)
+            return numbers, ~np.isnan(numbers)
+        text = values.astype('string').str.strip()
+        present = (text.notna() & (text != '')).to_numpy(dtype=bool, na_value=False)
+        numbers = pd.to_numeric(text, errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+        return numbers, present
+    parsed = [to_float(value) for value in values]
+    present = np.array([value is not None for value in parsed], dtype=bool)
+    numbers = np.array([np.nan if value is None else value for value in parsed], dtype=np.float64)
+    return numbers, present
+
+
+def input_columns(records):
+    """(rows, column name -> values); a single mapping stays a dict of one-element lists"""
+    if isinstance(records, pd.DataFrame):
+        return len(records), records
+    if isinstance(records, Mapping):
+        return 1, {name: [value] for name, value in records.items()}
+    frame = pd.DataFrame(list(records))
+    return len(frame), frame
+
+
+def describe_range(feature, unit):
+    low, high = RANGES[feature]
+    if unit == 'auto':
+        return (f"{FROM_TRAINING['°C'](low):.0f}-{FROM_TRAINING['°C'](high):.0f} °C "
+                f"or {low}-{high} °F")
+    if unit in FROM_TRAINING:
+        low, high = FROM_TRAINING[unit](low), FROM_TRAINING[unit](high)
+    return f"{low:.0f}-{high:.0f} {unit}"
+
+
+def find_errors(matrix, present, sources, chosen):
+    """row index -> messages, for rows with missing, non-numeric or implausible values.
+
+    sources[i] lists the (column, unit) candidates of feature i and
+    chosen[row, i] the one that row's value came from.
+    """
+    values = matrix.astype(np.float64, copy=False)
+    with np.errstate(invalid='ignore'):
+        out_of_range = (values < LOW) | (values > HIGH)
+        reversed_bp = values[:, SYSTOLIC] <= values[:, DIASTOLIC]
+    not_numeric = present & np.isnan(values)
+    bad = ~present | not_numeric | out_of_range
+
+    errors = {}
+    for row in np.flatnonzero(bad.any(axis=1) | reversed_bp):
+        messages = []
+        for i, feature in enumerate(FEATURES):
+            name, unit = sources[i][chosen[row, i]]
+            if name == 'blood_pressure':
+                name = feature
+            if not present[row, i]:
+                messages.append(f"{name} is required")
+            elif not_numeric[row, i]:
+                messages.append(f"{name} must be a number")
+            elif out_of_range[row, i]:
+                messages.append(f"{name} must be within {describe_range(feature, unit)}")
+        if not messages and reversed_bp[row]:
+            messages.append("systolic_bp must be higher than diastolic_bp")
+        errors[int(row)] = messages
+    return errors
+
+
+def assemble(records, defaults=None, dtype=np.float32, check=True):
+    """(matrix, errors): features in training order and units, plus per-row validation errors.
+
+    Columns are found through SOURCES and resolved per row: a row missing the
+    first column present takes its value from the next one, so batches may
+    mix e.g. ``height`` and ``height_cm``. Systolic/diastolic fall back to
+    splitting a "120/80" ``blood_pressure`` column, then to defaults (given
+    in training units). With check=False nothing is validated, a feature
+    with no column at all raises ValueError and errors is empty.
+    """
+    n_rows, columns = input_columns(records)
+    defaults = defaults or {}
+    matrix = np.empty((n_rows, len(FEATURES)), dtype=dtype)
+    present = np.ones((n_rows, len(FEATURES)), dtype=bool)
+    chosen = np.zeros((n_rows, len(FEATURES)), dtype=np.int8)
+    sources = []
+    bp = None
+    missing = []
+    for i, feature in enumerate(FEATURES):
+        candidates = [(name, unit) for name, unit in SOURCES[feature] if name in columns]
+        if i in (SYSTOLIC, DIASTOLIC) and 'blood_pressure' in columns:
+            candidates.append(('blood_pressure', 'mmHg'))
+        sources.append(candidates or [SOURCES[feature][0]])
+        if not candidates:
+            if feature in defaults:
+                matrix[:, i] = defaults[feature]
+            else:
+                matrix[:, i] = np.nan
+                present[:, i] = False
+                missing.append(SOURCES[feature][0][0])
+            continue
+
+        found = None
+        for k, (name, unit) in enumerate(candidates):
+            if name == 'blood_pressure':
+                if bp is None:
+                    bp = parse_blood_pressure(columns['blood_pressure'])
+                numbers = bp[0 if i == SYSTOLIC else 1]
+                given = ~np.isnan(numbers)
+            else:
+                numbers, given = parse_column(columns[name])
+                if unit in TO_TRAINING:
+                    numbers = TO_TRAINING[unit](numbers)
+            if found is None:
+                matrix[:, i] = numbers
+                found = given
+                continue
+            take = given & ~found
+            if take.any():
+                matrix[take, i] = numbers[take]
+                chosen[take, i] = k
+                found = found | take
+        present[:, i] = found
+
+    if not check:
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        return matrix, {}
+    return matrix, find_errors(matrix, present, sources, chosen)
+
+
+def validate(record, dtype=np.float32):
+    """Feature matrix for one record (or a batch), raising FeatureValidationError if any row is bad"""
+    matrix, errors = assemble(record, dtype=dtype)
+    if errors:
+        raise FeatureValidationError(errors)
+    return matrix
+
+
+def valid_mask(n_rows, errors):
+    mask = np.ones(n_rows, dtype=bool)
+    mask[list(errors)] = False
+    return mask
+
+
+def to_storage_units(matrix):
+    """Float64 copy of a training-units matrix in the predictions table's units"""
+    stored = np.array(matrix, dtype=np.float64)
+    for i, feature in enumerate(FEATURES):
+        unit = STORAGE[feature][0]
+        if unit in FROM_TRAINING:
+            stored[:, i] = FROM_TRAINING[unit](stored[:, i])
+    return stored
+
+
+def storage_rows(matrix):
+    """Tuples of (age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature)"""
+    stored = to_storage_units(matrix)
+    casts = [STORAGE[feature][1] for feature in FEATURES]
+    return [tuple(int(round(value)) if cast is int else round(value, 2) for cast, value in zip(casts, row))
+            for row in stored.tolist()]
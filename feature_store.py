@@ -0,0 +1,246 @@
+"""Columnar feature store shared by training and serving.
+
+Holds the canonical feature matrix (the seven vitals below) and the three
+training targets as append-only tables: one raw, typed file per column plus a
+meta.json with the row count and target categories. Reads memory-map each
+column without copying. Two partitions are kept: ``csv`` (imported from
+merged_data.csv by data_ingest) and ``logged`` (rows copied from the
+predictions table by sync_predictions).
+
+extract_features() turns CSV chunks and predictions rows into feature
+matrices through feature_schema, which also validates request input.
+
+    python feature_store.py sync --db healthcare.db --store backend/feature_store
+    python feature_store.py stats --store backend/feature_store
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import FEATURES, assemble
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are serialized within a process only
+    fcntl = None
+
+TARGETS = ['disease', 'medication_name', 'dosage']
+
+FEATURE_SCHEMA = {name: 'float32' for name in FEATURES}
+PARTITIONS = {
+    'csv': FEATURE_SCHEMA,
+    'logged': {**FEATURE_SCHEMA, 'prediction_id': 'int64'},
+}
+DEFAULT_STORE_DIR = os.environ.get('FEATURE_STORE_DIR', 'feature_store')
+
+
+def extract_features(records, defaults=None, dtype=np.float32):
+    """Feature matrix (n, len(FEATURES)) in training order and units from raw records.
+
+    records is a DataFrame, a list of dicts or a single mapping (one row);
+    columns and units are resolved by feature_schema. Values are not range
+    checked (use feature_schema.assemble for request input); features missing
+    from the input take their value from defaults, otherwise a ValueError is
+    raised.
+    """
+    return assemble(records, defaults=defaults, dtype=dtype, check=False)[0]
+
+
+class ColumnTable:
+    """Append-only table: one raw file per column, target labels stored as int32 codes"""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = dict(schema)
+        self._lock = threading.Lock()
+
+    def _file(self, name, dtype):
+        return os.path.join(self.path, f"{name}.{np.dtype(dtype).str.lstrip('<>|=')}")
+
+    def meta(self):
+        meta_path = os.path.join(self.path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'rows': 0, 'categories': {target: [] for target in TARGETS}}
+        with open(meta_path) as f:
+            return json.load(f)
+
+    def _write_meta(self, meta):
+        meta_path = os.path.join(self.path, 'meta.json')
+        tmp = meta_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp, meta_path)
+
+    @contextmanager
+    def _locked(self):
+        # Thread lock within the process, flock across processes
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            with open(os.path.join(self.path, '.lock'), 'w') as handle:
+                if fcntl is not None:
+                    fcntl.flock(handle, fcntl.LOCK_EX)
+                yield
+
+    def append(self, columns, labels=None, **meta_updates):
+        """Append rows: columns maps every schema column to an array, labels maps targets to string arrays"""
+        rows = len(next(iter(columns.values())))
+        with self._locked():
+            meta = self.meta()
+            start = meta['rows']
+            if rows:
+                for name, dtype in self.schema.items():
+                    self._write_column(self._file(name, dtype), start, np.asarray(columns[name], dtype=dtype))
+                for target in TARGETS:
+                    values = labels.get(target) if labels else None
+                    codes = self._encode(meta['categories'], target, values, rows)
+                    self._write_column(self._file(target, np.int32), start, codes)
+            meta['rows'] = start + rows
+            meta.update(meta_updates)
+            # meta.json is replaced last, so readers never see a partly written append
+            self._write_meta(meta)
+        return rows
+
+    @staticmethod
+    def _write_column(path, start, values):
+        with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+            # Overwrites anything past the committed row count (an interrupted append)
+            f.truncate(start * values.itemsize)
+            f.seek(start * values.itemsize)
+            f.write(values.tobytes())
+
+    @staticmethod
+    def _encode(categories, target, values, rows):
+        if values is None:
+            return np.full(rows, -1, dtype=np.int32)
+        known = categories.setdefault(target, [])
+        index = {label: i for i, label in enumerate(known)}
+        # Codes for this batch's own labels, remapped onto the table's category list
+        codes, uniques = pd.factorize(pd.Series(values))
+        remap = np.empty(len(uniques) + 1, dtype=np.int32)
+        remap[-1] = -1  # missing labels (factorize code -1)
+        for i, label in enumerate(uniques):
+            label = str(label)
+            if label not in index:
+                index[label] = len(known)
+                known.append(label)
+            remap[i] = index[label]
+        return remap[codes]
+
+    def read(self):
+        """(meta, {column: read-only memmap}) including the target code columns"""
+        meta = self.meta()
+        rows = meta['rows']
+        columns = {}
+        for name, dtype in [*self.schema.items(), *((target, np.int32) for target in TARGETS)]:
+            if rows == 0:
+                columns[name] = np.empty(0, dtype=dtype)
+            else:
+                columns[name] = np.memmap(self._file(name, dtype), dtype=dtype, mode='r', shape=(rows,))
+        return meta, columns
+
+    def reset(self, **meta):
+        """Empty the table (and set meta fields), e.g. before re-importing its source"""
+        with self._locked():
+            for name, dtype in [*self.schema.items(), *((target, np.int32) for target in TARGETS)]:
+                path = self._file(name, dtype)
+                if os.path.exists(path):
+                    os.remove(path)
+            self._write_meta({'rows': 0, 'categories': {target: [] for target in TARGETS}, **meta})
+
+
+class FeatureStore:
+    def __init__(self, root=DEFAULT_STORE_DIR):
+        self.root = root
+        self.tables = {name: ColumnTable(os.path.join(root, name), schema) for name, schema in PARTITIONS.items()}
+
+    def columns(self, partition='csv'):
+        """Zero-copy column views of one partition"""
+        return self.tables[partition].read()[1]
+
+    def load(self, partitions=('csv',)):
+        """(float32 feature matrix, {target: pd.Categorical}) over the given partitions"""
+        parts = [self.tables[name].read() for name in partitions]
+        if len(parts) == 1:
+            meta, columns = parts[0]
+            categories = meta['categories']
+            codes = {target: columns[target] for target in TARGETS}
+        else:
+            # Union the category lists and remap each partition's codes onto it
+            categories = {}
+            codes = {}
+            for target in TARGETS:
+                merged = list(dict.fromkeys(label for meta, _ in parts for label in meta['categories'].get(target, [])))
+                position = {label: i for i, label in enumerate(merged)}
+                chunks = []
+                for meta, columns in parts:
+                    remap = np.array([position[label] for label in meta['categories'].get(target, [])] + [-1],
+                                     dtype=np.int32)
+                    chunks.append(remap[columns[target]])
+                categories[target] = merged
+                codes[target] = np.concatenate(chunks) if chunks else np.empty(0, np.int32)
+
+        rows = sum(meta['rows'] for meta, _ in parts)
+        # The one copy: columns gathered into the row-major matrix the models take
+        X = np.empty((rows, len(FEATURES)), dtype=np.float32)
+        offset = 0
+        for meta, columns in parts:
+            for i, feature in enumerate(FEATURES):
+                X[offset:offset + meta['rows'], i] = columns[feature]
+            offset += meta['rows']
+        targets = {target: pd.Categorical.from_codes(codes[target], categories=categories.get(target, []))
+                   for target in TARGETS}
+        return X, targets
+
+    def sync_predictions(self, db_path, chunksize=50000):
+        """Append predictions rows newer than the last sync to the logged partition, returns rows added"""
+        table = self.tables['logged']
+        high_water = table.meta().get('high_water', 0)
+        conn = sqlite3.connect(db_path)
+        added = 0
+        try:
+            cursor = conn.execute("""
+                SELECT id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature,
+                       prediction, medication, dosage
+                FROM predictions WHERE id > ? ORDER BY id
+            """, (high_water,))
+            names = [col[0] for col in cursor.description]
+            while True:
+                batch = cursor.fetchmany(chunksize)
+                if not batch:
+                    break
+                chunk = pd.DataFrame.from_records(batch, columns=names)
+                matrix = extract_features(chunk)
+                columns = {feature: matrix[:, i] for i, feature in enumerate(FEATURES)}
+                columns['prediction_id'] = chunk['id'].to_numpy()
+                labels = {'disease': chunk['prediction'], 'medication_name': chunk['medication'],
+                          'dosage': chunk['dosage']}
+                added += table.append(columns, labels, high_water=int(chunk['id'].iloc[-1]))
+        finally:
+            conn.close()
+        return added
+
+    def stats(self):
+        return {name: {'rows': table.meta()['rows'], 'path': table.path} for name, table in self.tables.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('command', choices=['sync', 'stats'])
+    parser.add_argument('--store', default=DEFAULT_STORE_DIR)
+    parser.add_argument('--db', default='healthcare.db')
+    args = parser.parse_args()
+
+    store = FeatureStore(args.store)
+    if args.command == 'sync':
+        print(f"Appended {store.sync_predictions(args.db)} logged predictions to {args.store}")
+    print(json.dumps(store.stats(), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+import numpy as np
+
+# Compiled forests: a fitted RandomForestClassifier flattened into a few
+# contiguous arrays so serving can skip sklearn's per-call overhead.
+COMPILED_SUFFIX = ".forest.npz"
+
+
+class CompiledForest:
+    """Vectorized inference over a flattened random forest.
+
+    All trees share one node table; ``roots[t]`` is the first node of tree
+    ``t``. Leaves are marked by ``left == -1`` and ``value`` holds each leaf's
+    normalized class distribution per output, shaped
+    ``(n_nodes, n_outputs, max_classes)``. Predictions match sklearn: inputs
+    are cast to float32 before comparing against thresholds, per-tree
+    probabilities are averaged and the arg-max class is returned. Multi-output
+    forests return one column per target, like sklearn.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, classes,
+                 n_features=None):
+        if value.ndim == 2:
+            value = value[:, None, :]
+            classes = [classes]
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.n_outputs_ = value.shape[1]
+        self.classes_ = classes[0] if self.n_outputs_ == 1 else list(classes)
+        # Traversal tables: (left, right) pairs so the right child is at
+        # 2 * node + 1, with leaves pointing at themselves behind an infinite
+        # threshold, so a pass over finished slots leaves them in place
+        is_leaf = left == -1
+        node = np.arange(len(left), dtype=np.intp)
+        self.is_leaf = is_leaf
+        self.children = np.ascontiguousarray(
+            np.column_stack([np.where(is_leaf, node, left), np.where(is_leaf, node, right)]).ravel())
+        self.split_feature = np.where(is_leaf, 0, feature).astype(np.intp)
+        self.split_threshold = np.where(is_leaf, np.inf, threshold)
+        self.n_features_in_ = int(n_features) if n_features is not None else int(feature.max()) + 1
+
+    @property
+    def n_estimators(self):
+        return len(self.roots)
+
+    def apply(self, X):
+        """Leaf node index for every (row, tree) pair"""
+        return self._leaves(X).T
+
+    def _leaves(self, X):
+        """Leaf node indices, shaped (n_trees, n_rows)"""
+        # sklearn's trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows, n_features = X.shape
+        n_trees = len(self.roots)
+        X_flat = X.ravel()
+
+        # One flat slot per (row, tree), tree-major so neighbouring slots walk
+        # the same tree. While most slots are still on internal nodes every
+        # slot is advanced (leaves loop on themselves); once fewer than a
+        # quarter remain the survivors are compacted and only they advance.
+        nodes = np.repeat(self.roots.astype(np.intp), n_rows)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.intp) * n_features, n_trees)
+        while True:
+            value = X_flat[row_offset + self.split_feature[nodes]]
+            nodes = self.children[2 * nodes + (value > self.split_threshold[nodes])]
+            active = np.flatnonzero(~self.is_leaf[nodes])
+            if active.size < nodes.size // 4:
+                break
+        current = nodes[active]
+        offset = row_offset[active]
+        while active.size:
+            value = X_flat[offset + self.split_feature[current]]
+            current = self.children[2 * current + (value > self.split_threshold[current])]
+            running = ~self.is_leaf[current]
+            if not running.all():
+                finished = ~running
+                nodes[active[finished]] = current[finished]
+                active, current, offset = active[running], current[running], offset[running]
+        return nodes.reshape(n_trees, n_rows)
+
+    def _proba(self, X, chunk_size):
+        # Rows are processed in chunks to bound the (rows, trees, classes) gather
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        value = self.value.reshape(len(self.value), -1)
+        proba = np.empty((X.shape[0], value.shape[1]), dtype=np.float64)
+        for start in range(0, X.shape[0], chunk_size):
+            # Summed tree by tree (in sklearn's order): one (rows, classes) gather each
+            chunk = proba[start:start + chunk_size]
+            chunk[:] = 0.0
+            for leaves in self._leaves(X[start:start + chunk_size]):
+                chunk += value[leaves]
+        proba /= self.n_estimators
+        return proba.reshape((X.shape[0],) + self.value.shape[1:])
+
+    def predict_proba(self, X, chunk_size=1024):
+        proba = self._proba(X, chunk_size)
+        if self.n_outputs_ == 1:
+            return proba[:, 0, :len(self.classes_)]
+        return [proba[:, k, :len(classes)] for k, classes in enumerate(self.classes_)]
+
+    def predict(self, X, chunk_size=1024):
+        proba = self._proba(X, chunk_size)
+        if self.n_outputs_ == 1:
+            return self.classes_.take(np.argmax(proba[:, 0, :len(self.classes_)], axis=1), axis=0)
+        predictions = np.empty((proba.shape[0], self.n_outputs_), dtype=object)
+        for k, classes in enumerate(self.classes_):
+            predictions[:, k] = classes.take(np.argmax(proba[:, k, :len(classes)], axis=1), axis=0)
+        return predictions
+
+
+def compile_forest(model):
+    """Flatten a fitted RandomForestClassifier (single or multi-output) into a CompiledForest"""
+    n_outputs = getattr(model, "n_outputs_", 1)
+    classes = [model.classes_] if n_outputs == 1 else list(model.classes_)
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        left = tree.children_left.astype(np.int32)
+        right = tree.children_right.astype(np.int32)
+        is_leaf = left == -1
+        lefts.append(np.where(is_leaf, -1, left + offset).astype(np.int32))
+        rights.append(np.where(is_leaf, -1, right + offset).astype(np.int32))
+        features.append(tree.feature.astype(np.int32))
+        thresholds.append(tree.threshold.astype(np.float64))
+
+        # value is (n_nodes, n_outputs, max_classes); normalize each output to
+        # probabilities (older sklearn stores weighted counts, newer fractions)
+        value = np.zeros(tree.value.shape, dtype=np.float64)
+        for k, output_classes in enumerate(classes):
+            counts = tree.value[:, k, :len(output_classes)].astype(np.float64)
+            totals = counts.sum(axis=1, keepdims=True)
+            totals[totals == 0] = 1.0
+            value[:, k, :len(output_classes)] = counts / totals
+        values.append(value)
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=np.ascontiguousarray(np.concatenate(features)),
+        threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+        left=np.ascontiguousarray(np.concatenate(lefts)),
+        right=np.ascontiguousarray(np.concatenate(rights)),
+        value=np.ascontiguousarray(np.concatenate(values)),
+        roots=np.asarray(roots, dtype=np.int32),
+        max_depth=max_depth,
+        classes=[np.asarray(c) for c in classes],
+        n_features=model.n_features_in_,
+    )
+
+
+def save_compiled(forest, path):
+    # Class labels are stored as strings (one array per output) so the file
+    # loads without pickle
+    classes = [forest.classes_] if forest.n_outputs_ == 1 else forest.classes_
+    np.savez(
+        path,
+        feature=forest.feature,
+        threshold=forest.threshold,
+        left=forest.left,
+        right=forest.right,
+        value=forest.value,
+        roots=forest.roots,
+        max_depth=np.int64(forest.max_depth),
+        n_features=np.int64(forest.n_features_in_),
+        n_outputs=np.int64(forest.n_outputs_),
+        **{f"classes_{k}": np.asarray(c).astype(str) for k, c in enumerate(classes)},
+    )
+    return path
+
+
+def load_compiled(path):
+    with np.load(path, allow_pickle=False) as data:
+        n_outputs = int(data["n_outputs"])
+        return CompiledForest(
+            feature=data["feature"],
+            threshold=data["threshold"],
+            left=data["left"],
+            right=data["right"],
+            value=data["value"],
+            roots=data["roots"],
+            max_depth=int(data["max_depth"]),
+            classes=[data[f"classes_{k}"] for k in range(n_outputs)],
+            n_features=int(data["n_features"]),
+        )
+
+
+def verify_compiled(model, forest, X):
+    """True when the compiled forest reproduces sklearn's predictions on X"""
+    expected = np.asarray(model.predict(X)).astype(str)
+    actual = np.asarray(forest.predict(np.asarray(X))).astype(str)
+    return bool(np.array_equal(expected, actual))
@@ -0,0 +1,93 @@
+import json
+import os
+import random
+from collections import deque
+
+# Keyword intent engine for the fallback chat responder. Keywords from every
+# intent are compiled once into a single Aho-Corasick automaton, so matching a
+# message is one pass over its characters no matter how many intents exist.
+INTENTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intents.json")
+
+
+def is_word_char(ch):
+    return ch.isalnum() or ch == "_"
+
+
+class IntentMatcher:
+    """Matches messages against whole-word keywords; earlier intents win ties"""
+
+    def __init__(self, intents, defaults=None):
+        self.intents = list(intents)
+        self.defaults = list(defaults or [])
+        # Trie nodes: goto transitions, failure links and (keyword length, intent index) outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for index, intent in enumerate(self.intents):
+            for keyword in intent["keywords"]:
+                self._add(keyword.lower(), index)
+        self._build_failure_links()
+
+    def _add(self, keyword, index):
+        node = 0
+        for ch in keyword:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append((len(keyword), index))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                # Inherit matches that end here through the failure chain
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, message):
+        """The highest-priority intent with a keyword in message, or None"""
+        text = message.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        best = None
+        node = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, index in out[node]:
+                if best is not None and index >= best:
+                    continue
+                # Whole words only: "hi" must not match inside "this"
+                start = i - length + 1
+                if start > 0 and is_word_char(text[start - 1]):
+                    continue
+                if i < last and is_word_char(text[i + 1]):
+                    continue
+                best = index
+                if best == 0:
+                    return self.intents[0]
+        return self.intents[best] if best is not None else None
+
+    def respond(self, message):
+        intent = self.match(message)
+        if intent is not None:
+            return intent["response"]
+        # Varied default responses to avoid repetition
+        return random.choice(self.defaults)
+
+
+def load_intents(path=INTENTS_PATH):
+    with open(path) as f:
+        table = json.load(f)
+    return IntentMatcher(table["intents"], table.get("defaults"))
@@ -0,0 +1,230 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Gateway to the upstream LLM (Gemini generateContent REST API) for /api/chat.
+# One pooled HTTP session is shared by all request threads, concurrent upstream
+# calls are capped, answers are cached by normalized question and any timeout
+# or error falls back to the local mock responder.
+DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+DEFAULT_MODEL = "gemini-1.5-flash"
+
+
+def sentence_chunks(text):
+    """Split a finished answer into sentence-sized chunks for streaming"""
+    return [chunk for chunk in re.findall(r"[^.!?]+[.!?]*\s*", text) if chunk]
+
+
+def normalize_prompt(text):
+    """Cache key for a prompt: lowercase, punctuation dropped, whitespace collapsed"""
+    return " ".join(re.sub(r"[^\w\s]", " ", text.lower()).split())
+
+
+class LLMGateway:
+    def __init__(self, base_url=DEFAULT_BASE_URL, api_key=None, model=DEFAULT_MODEL, timeout=10.0,
+                 max_concurrency=8, queue_timeout=1.0, cache_size=1024, cache_ttl=3600, pool_size=16):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.queue_timeout = queue_timeout
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "upstream_calls": 0,
+            "upstream_errors": 0,
+            "timeouts": 0,
+            "throttled": 0,
+            "fallbacks": 0,
+            "upstream_seconds_total": 0.0,
+            "upstream_seconds_max": 0.0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self._metrics[name] += amount
+
+    def _cache_get(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            text, stored_at = entry
+            if time.monotonic() - stored_at > self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return text
+
+    def _cache_put(self, key, text):
+        with self._lock:
+            self._cache[key] = (text, time.monotonic())
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _call_upstream(self, prompt):
+        url = f"{self.base_url}/v1beta/models/{self.model}:generateContent"
+        params = {"key": self.api_key} if self.api_key else None
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        started = time.perf_counter()
+        try:
+            response = self.session.post(url, params=params, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            return data["candidates"][0]["content"]["parts"][0]["text"]
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._metrics["upstream_calls"] += 1
+                self._metrics["upstream_seconds_total"] += elapsed
+                self._metrics["upstream_seconds_max"] = max(self._metrics["upstream_seconds_max"], elapsed)
+
+    def generate(self, prompt, fallback, cache_key=None):
+        """Answer prompt upstream; fallback() supplies the answer on timeout, error or overload.
+
+        cache_key (normalized) identifies answers that can be reused, e.g. the
+        user's question for context-free FAQs; it defaults to the prompt.
+        """
+        self._count("requests")
+        key = normalize_prompt(cache_key if cache_key is not None else prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count("cache_hits")
+            return cached
+        self._count("cache_misses")
+
+        # Concurrency limit: wait briefly for a slot, otherwise answer locally
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("throttled")
+            self._count("fallbacks")
+            return fallback()
+        try:
+            text = self._call_upstream(prompt)
+        except requests.Timeout:
+            self._count("timeouts")
+            self._count("fallbacks")
+            return fallback()
+        except Exception as e:
+            print(f"LLM gateway error: {str(e)}")
+            self._count("upstream_errors")
+            self._count("fallbacks")
+            return fallback()
+        finally:
+            self._slots.release()
+
+        self._cache_put(key, text)
+        return text
+
+    def _stream_upstream(self, prompt):
+        url = f"{self.base_url}/v1beta/models/{self.model}:streamGenerateContent"
+        params = {"alt": "sse"}
+        if self.api_key:
+            params["key"] = self.api_key
+        payload = {"contents": [{"parts": [{"text": prompt}]}]}
+        started = time.perf_counter()
+        try:
+            with self.session.post(url, params=params, json=payload, timeout=self.timeout, stream=True) as response:
+                response.raise_for_status()
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    data = json.loads(line[len("data:"):])
+                    for part in data["candidates"][0]["content"]["parts"]:
+                        if part.get("text"):
+                            yield part["text"]
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._metrics["upstream_calls"] += 1
+                self._metrics["upstream_seconds_total"] += elapsed
+                self._metrics["upstream_seconds_max"] = max(self._metrics["upstream_seconds_max"], elapsed)
+
+    def stream(self, prompt, fallback, cache_key=None):
+        """Like generate(), but yields the answer in chunks as the upstream produces them.
+
+        If the upstream fails before sending anything the fallback answer is
+        streamed instead; a failure mid-answer is re-raised, so the caller can
+        report it rather than keep a truncated reply.
+        """
+        self._count("requests")
+        key = normalize_prompt(cache_key if cache_key is not None else prompt)
+        cached = self._cache_get(key)
+        if cached is not None:
+            self._count("cache_hits")
+            yield from sentence_chunks(cached)
+            return
+        self._count("cache_misses")
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            self._count("throttled")
+            self._count("fallbacks")
+            yield from sentence_chunks(fallback())
+            return
+
+        parts = []
+        try:
+            for chunk in self._stream_upstream(prompt):
+                parts.append(chunk)
+                yield chunk
+        except Exception as e:
+            if isinstance(e, requests.Timeout):
+                self._count("timeouts")
+            else:
+                print(f"LLM gateway error: {str(e)}")
+                self._count("upstream_errors")
+            if parts:
+                raise
+            self._count("fallbacks")
+            yield from sentence_chunks(fallback())
+            return
+        finally:
+            self._slots.release()
+
+        self._cache_put(key, "".join(parts))
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["cache_entries"] = len(self._cache)
+        lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        metrics["cache_hit_rate"] = metrics["cache_hits"] / lookups if lookups else 0.0
+        calls = metrics["upstream_calls"]
+        metrics["upstream_seconds_avg"] = metrics["upstream_seconds_total"] / calls if calls else 0.0
+        metrics["base_url"] = self.base_url
+        return metrics
+
+    def close(self):
+        self.session.close()
+
+
+def create_gateway():
+    """Gateway configured from GEMINI_API_KEY / LLM_BASE_URL, or None to use the mock responder only"""
+    api_key = os.environ.get("GEMINI_API_KEY")
+    base_url = os.environ.get("LLM_BASE_URL")
+    if not api_key and not base_url:
+        return None
+    return LLMGateway(
+        base_url=base_url or DEFAULT_BASE_URL,
+        api_key=api_key,
+        model=os.environ.get("LLM_MODEL", DEFAULT_MODEL),
+        timeout=float(os.environ.get("LLM_TIMEOUT", "10")),
+        max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", "8")),
+        cache_size=int(os.environ.get("LLM_CACHE_SIZE", "1024")),
+    )
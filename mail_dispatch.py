@@ -0,0 +1,339 @@
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import OrderedDict
+from email.message import EmailMessage
+
+# Outbound mail for OTP codes. Request threads queue a message and return;
+# worker threads each keep one SMTP connection open, send whatever has queued
+# up in a batch over it and retry transient failures with exponential backoff.
+# Point SMTP_HOST/SMTP_PORT at a local debugging server to test, e.g.
+#   python -m aiosmtpd -n -l localhost:1025
+
+
+class OutboundMessage:
+    __slots__ = ("id", "to", "subject", "body", "attempts", "enqueued_at")
+
+    def __init__(self, message_id, to, subject, body):
+        self.id = message_id
+        self.to = to
+        self.subject = subject
+        self.body = body
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+
+
+class MailDispatcher:
+    """Queue plus a pool of SMTP worker threads.
+
+    ``send`` returns a message id whose delivery can be checked with
+    ``status``; ``stats`` reports queue depth, send latency and counters.
+    Connections idle for longer than ``idle_timeout`` are checked with NOOP
+    before reuse and reopened if the server dropped them.
+    """
+
+    def __init__(self, host="localhost", port=25, sender="no-reply@localhost", username=None, password=None,
+                 starttls=False, use_ssl=False, workers=2, batch_size=20, batch_window=0.05, max_queue=10000,
+                 max_attempts=4, backoff=1.0, max_backoff=60.0, timeout=10.0, idle_timeout=30.0,
+                 status_size=10000):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.use_ssl = use_ssl
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.status_size = status_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._threads = []
+        self._timers = {}     # retry timer -> message
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._next_id = 0
+        self._pending = 0     # queued, sending or waiting for a retry
+        self._status = OrderedDict()
+        self._counters = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "rejected": 0,
+            "retries": 0,
+            "batches": 0,
+            "connections_opened": 0,
+            "send_seconds_total": 0.0,
+            "send_seconds_max": 0.0,
+            "delivery_seconds_total": 0.0,
+            "delivery_seconds_max": 0.0,
+        }
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [t for t in self._threads if t.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"mail-dispatch-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def _set_status(self, message_id, state, error=None):
+        # Called with self._lock held; keeps only the most recent status_size entries
+        self._status[message_id] = {"state": state, "error": error, "updated": time.time()}
+        self._status.move_to_end(message_id)
+        while len(self._status) > self.status_size:
+            self._status.popitem(last=False)
+
+    def send(self, to, subject, body):
+        """Queue a plain-text message, returns its id (None if the queue is full or stopped)"""
+        if self._stop.is_set():
+            return None
+        with self._lock:
+            self._next_id += 1
+            message = OutboundMessage(self._next_id, to, subject, body)
+            self._pending += 1
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            with self._lock:
+                self._pending -= 1
+                self._counters["rejected"] += 1
+                self._set_status(message.id, "rejected", "queue full")
+                self._idle.notify_all()
+            return None
+        with self._lock:
+            self._counters["enqueued"] += 1
+            if message.id not in self._status:
+                self._set_status(message.id, "queued")
+        return message.id
+
+    def status(self, message_id):
+        with self._lock:
+            entry = self._status.get(message_id)
+            return dict(entry, id=message_id) if entry else None
+
+    def _connect(self):
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.starttls:
+                smtp.starttls()
+        if self.username:
+            smtp.login(self.username, self.password or "")
+        with self._lock:
+            self._counters["connections_opened"] += 1
+        return smtp
+
+    def _build(self, message):
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message.to
+        email["Subject"] = message.subject
+        email.set_content(message.body)
+        return email
+
+    def _drain(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _finish(self, message, state, error=None, elapsed=0.0):
+        with self._lock:
+            self._pending -= 1
+            self._set_status(message.id, state, error)
+            if state == "sent":
+                delivery = time.monotonic() - message.enqueued_at
+                self._counters["sent"] += 1
+                self._counters["send_seconds_total"] += elapsed
+                self._counters["send_seconds_max"] = max(self._counters["send_seconds_max"], elapsed)
+                self._counters["delivery_seconds_total"] += delivery
+                self._counters["delivery_seconds_max"] = max(self._counters["delivery_seconds_max"], delivery)
+            else:
+                self._counters["failed"] += 1
+            self._idle.notify_all()
+
+    def _requeue(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            self._finish(message, "failed", "queue full on retry")
+
+    def _retry_later(self, message, error):
+        if message.attempts >= self.max_attempts or self._stop.is_set():
+            self._finish(message, "failed", error)
+            return
+        delay = min(self.backoff * 2 ** (message.attempts - 1), self.max_backoff)
+        with self._lock:
+            self._counters["retries"] += 1
+            self._set_status(message.id, "retrying", error)
+
+        def fire():
+            with self._lock:
+                if self._timers.pop(timer, None) is None:
+                    return  # stop() already gave up on it
+            self._requeue(message)
+
+        timer = threading.Timer(delay, fire)
+        timer.daemon = True
+        with self._lock:
+            self._timers[timer] = message
+        timer.start()
+
+    def _send_batch(self, smtp, batch):
+        """Send batch over smtp (reconnecting if needed), returns the connection to keep"""
+        with self._lock:
+            self._counters["batches"] += 1
+        for index, message in enumerate(batch):
+            message.attempts += 1
+            started = time.perf_counter()
+            try:
+                if smtp is None:
+                    smtp = self._connect()
+                smtp.send_message(self._build(message))
+            except smtplib.SMTPRecipientsRefused as e:
+                self._finish(message, "failed", f"recipient refused: {e.recipients}")
+                continue
+            except smtplib.SMTPResponseException as e:
+                # 5xx is permanent, 4xx (e.g. greylisting) is worth retrying
+                if e.smtp_code >= 500:
+                    self._finish(message, "failed", f"{e.smtp_code} {e.smtp_error!r}")
+                else:
+                    self._retry_later(message, f"{e.smtp_code} {e.smtp_error!r}")
+                if e.smtp_code == 421:
+                    # Server is closing the channel
+                    self._close(smtp)
+                    smtp = None
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                print(f"Mail dispatch error: {str(e)}")
+                self._retry_later(message, str(e))
+                # The connection is in an unknown state; drop it and retry the rest later
+                self._close(smtp)
+                for rest in batch[index + 1:]:
+                    self._retry_later(rest, "connection lost")
+                return None
+            self._finish(message, "sent", elapsed=time.perf_counter() - started)
+        return smtp
+
+    def _close(self, smtp):
+        if smtp is None:
+            return
+        try:
+            smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            smtp.close()
+
+    def _run(self):
+        smtp = None
+        last_used = 0.0
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    first = self._queue.get(timeout=0.5)
+                except queue.Empty:
+                    if smtp is not None and time.monotonic() - last_used > self.idle_timeout:
+                        self._close(smtp)
+                        smtp = None
+                    continue
+                batch = self._drain(first)
+                if smtp is not None and time.monotonic() - last_used > self.idle_timeout:
+                    try:
+                        smtp.noop()
+                    except (smtplib.SMTPException, OSError):
+                        smtp = None
+                with self._lock:
+                    for message in batch:
+                        self._set_status(message.id, "sending")
+                smtp = self._send_batch(smtp, batch)
+                last_used = time.monotonic()
+        finally:
+            self._close(smtp)
+
+    def flush(self, timeout=None):
+        """Block until every queued message has been sent or given up on, including retries"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stop(self, timeout=10.0):
+        """Stop accepting mail, send what is queued and join the workers; pending retries are dropped"""
+        self._stop.set()
+        with self._lock:
+            timers = list(self._timers.items())
+            self._timers.clear()
+        for timer, message in timers:
+            timer.cancel()
+            self._finish(message, "failed", "dispatcher stopped")
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            counters["pending"] = self._pending
+            counters["retry_scheduled"] = len(self._timers)
+        sent = counters["sent"]
+        counters["queue_depth"] = self._queue.qsize()
+        counters["queue_capacity"] = self._queue.maxsize
+        counters["send_seconds_avg"] = counters["send_seconds_total"] / sent if sent else 0.0
+        counters["delivery_seconds_avg"] = counters["delivery_seconds_total"] / sent if sent else 0.0
+        counters["workers"] = sum(t.is_alive() for t in self._threads)
+        counters["server"] = f"{self.host}:{self.port}"
+        return counters
+
+
+def create_dispatcher():
+    """Dispatcher configured from SMTP_HOST and friends, or None to keep printing codes to the console"""
+    host = os.environ.get("SMTP_HOST")
+    if not host:
+        return None
+    use_ssl = os.environ.get("SMTP_SSL", "").lower() in ("1", "true", "yes")
+    return MailDispatcher(
+        host=host,
+        port=int(os.environ.get("SMTP_PORT", "465" if use_ssl else "25")),
+        sender=os.environ.get("MAIL_FROM", "no-reply@localhost"),
+        username=os.environ.get("SMTP_USER") or None,
+        password=os.environ.get("SMTP_PASSWORD") or None,
+        starttls=os.environ.get("SMTP_STARTTLS", "").lower() in ("1", "true", "yes"),
+        use_ssl=use_ssl,
+        workers=int(os.environ.get("MAIL_WORKERS", "2")),
+        batch_size=int(os.environ.get("MAIL_BATCH_SIZE", "20")),
+        max_attempts=int(os.environ.get("MAIL_MAX_ATTEMPTS", "4")),
+    )
+
+
+dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    """The process-wide dispatcher, started on first use (None when SMTP is not configured)"""
+    global dispatcher
+    if dispatcher is None:
+        with _dispatcher_lock:
+            if dispatcher is None:
+                created = create_dispatcher()
+                if created is None:
+                    return None
+                dispatcher = created.start()
+                atexit.register(dispatcher.stop)
+    return dispatcher
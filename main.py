@@ -1,5 +1,139 @@
-def main():
-    print("Hello from backend!")
+"""Production entry point: gunicorn with the app preloaded in the master.
+
+The master imports app.py once, loads the models /predict uses (MODEL_PRELOAD
+defaults to "predict" here), runs the schema migrations and freezes the heap
+before forking, so workers share the model arrays copy-on-write instead of
+each loading their own. SQLite connections opened while preloading are closed
+before the fork and background threads (model watcher, sampling profiler) are
+started in each worker, since threads don't survive fork.
+
+    python main.py --workers 4 --threads 8        # gthread workers (default)
+    python main.py --async --worker-connections 500  # gevent, for chat/LLM-heavy traffic
+    python main.py --dev                           # Flask debug server, as app.py
+
+Graceful reload: ``kill -HUP <master pid>`` replaces the workers without
+dropping in-flight requests (they fork from the already loaded master, so
+new model files reach them through MODEL_WATCH_INTERVAL); to deploy new code
+send USR2 and then QUIT to the old master. Settings also come from the
+environment (WEB_CONCURRENCY, WEB_THREADS, BIND, WORKER_CLASS, ...).
+"""
+import argparse
+import gc
+import os
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bind", default=os.environ.get("BIND", "0.0.0.0:8000"))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_CONCURRENCY", os.cpu_count() or 2),
+                        help="worker processes (default: one per CPU; inference is CPU-bound)")
+    parser.add_argument("--threads", type=int, default=env_int("WEB_THREADS", 4),
+                        help="request threads per gthread worker")
+    parser.add_argument("--worker-class", default=os.environ.get("WORKER_CLASS", "gthread"),
+                        choices=["gthread", "sync", "gevent"])
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="gevent workers: chat and LLM calls wait on I/O cooperatively")
+    parser.add_argument("--worker-connections", type=int, default=env_int("WORKER_CONNECTIONS", 1000),
+                        help="concurrent requests per gevent worker")
+    parser.add_argument("--timeout", type=int, default=env_int("WORKER_TIMEOUT", 60))
+    parser.add_argument("--graceful-timeout", type=int, default=env_int("GRACEFUL_TIMEOUT", 30))
+    parser.add_argument("--keepalive", type=int, default=env_int("KEEPALIVE", 5))
+    parser.add_argument("--max-requests", type=int, default=env_int("MAX_REQUESTS", 0),
+                        help="recycle a worker after this many requests (0 = never)")
+    parser.add_argument("--max-requests-jitter", type=int, default=env_int("MAX_REQUESTS_JITTER", 0))
+    parser.add_argument("--pidfile", default=os.environ.get("PIDFILE"))
+    parser.add_argument("--no-preload", dest="preload", action="store_false",
+                        help="import the app in each worker instead of the master")
+    parser.add_argument("--dev", action="store_true", help="run the Flask debug server instead")
+    args = parser.parse_args(argv)
+    if args.use_async:
+        args.worker_class = "gevent"
+    return args
+
+
+def load_app():
+    """Import the app, load models and migrate the schema; runs once in the master when preloading"""
+    # Only the models predict_targets reads; the rest still load lazily if asked for
+    os.environ.setdefault("MODEL_PRELOAD", "predict")
+    import app as web
+    import database
+
+    web.init_db()
+    # Started again per worker in post_fork
+    web.models.stop_watcher()
+    # Children must not share the master's SQLite handles
+    database.close_pools()
+    # Move everything allocated so far out of the collector's reach, so GC
+    # passes in workers don't write to (and un-share) the preloaded pages
+    gc.collect()
+    gc.freeze()
+    return web.app
+
+
+def post_fork(server, worker):
+    import app as web
+    import metrics
+
+    if web.model_watch_interval > 0:
+        web.models.start_watcher(web.model_watch_interval)
+    if os.environ.get("PROFILE_SAMPLING", "0").lower() in ("1", "true", "yes"):
+        metrics.profiler.start()
+
+
+def gunicorn_options(args):
+    return {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": args.worker_class,
+        "worker_connections": args.worker_connections,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": args.keepalive,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "pidfile": args.pidfile,
+        "preload_app": args.preload,
+        "post_fork": post_fork,
+        "accesslog": os.environ.get("ACCESS_LOG"),
+    }
+
+
+def serve(args):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            for key, value in gunicorn_options(args).items():
+                if value is not None:
+                    self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    Server().run()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.use_async or args.worker_class == "gevent":
+        # Patch before app.py creates its locks, pools and HTTP session, so
+        # blocking calls (LLM requests, SMTP) yield to other greenlets
+        from gevent import monkey
+
+        monkey.patch_all()
+        os.environ.setdefault("DB_CLOSE_ON_TEARDOWN", "1")
+    if args.dev:
+        import app as web
+
+        web.init_db()
+        web.app.run(debug=True)
+        return
+    serve(args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,233 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from flask import Response, g, request
+
+# In-process instrumentation: per-route latency histograms, timed spans for
+# the hot paths inside requests, gauges collected from the app's own stats()
+# at scrape time, all exposed at /metrics in the Prometheus text format.
+# Metrics are per process; with several workers scrape each one (or let the
+# serving layer aggregate).
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names, values, extra=None):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self, lines):
+        lines.append(f"# HELP {self.name} {self.help}")
+        lines.append(f"# TYPE {self.name} histogram")
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for i, bound in enumerate(self.buckets + ("+Inf",)):
+                cumulative += series[i]
+                bucket_labels = format_labels(self.labelnames, labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{format_labels(self.labelnames, labels)} {cumulative}")
+
+
+class Registry:
+    def __init__(self):
+        self.histograms = []
+        self.collectors = []  # (name, type, help, fn returning a number or {label values: number})
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        histogram = Histogram(name, help_text, labelnames, buckets)
+        self.histograms.append(histogram)
+        return histogram
+
+    def gauge(self, name, help_text, fn, labelnames=(), kind="gauge"):
+        """Register a value read from fn() at scrape time"""
+        self.collectors.append((name, kind, help_text, tuple(labelnames), fn))
+
+    def render(self):
+        lines = []
+        for histogram in self.histograms:
+            histogram.render(lines)
+        for name, kind, help_text, labelnames, fn in self.collectors:
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"Metrics collector {name} error: {str(e)}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if isinstance(value, dict):
+                for labels, number in sorted(value.items()):
+                    labels = labels if isinstance(labels, tuple) else (labels,)
+                    lines.append(f"{name}{format_labels(labelnames, labels)} {float(number)}")
+            elif value is not None:
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+request_latency = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status"))
+span_latency = registry.histogram(
+    "app_span_duration_seconds", "Time spent in instrumented sections of request handlers", ("span",))
+
+events = Counter()
+_events_lock = threading.Lock()
+registry.gauge("app_events_total", "Notable application events (errors, submissions)",
+               lambda: dict(events), ("event",), kind="counter")
+
+
+def count(event, amount=1):
+    with _events_lock:
+        events[event] += amount
+
+
+@contextmanager
+def span(name):
+    """Time a block; recorded in app_span_duration_seconds and the request's Server-Timing header"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        span_latency.observe(elapsed, name)
+        try:
+            timings = g.setdefault("span_timings", {})
+            timings[name] = timings.get(name, 0.0) + elapsed
+        except RuntimeError:
+            pass  # outside an app context (e.g. background threads)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval and counts folded stacks.
+
+    folded() returns lines of ``frame;frame;frame count`` (root first), the
+    input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.started_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            with self._lock:
+                self.samples.clear()
+            self._stop.clear()
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                with self._lock:
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def summary(self):
+        with self._lock:
+            return {"running": self.running, "stacks": len(self.samples), "samples": sum(self.samples.values())}
+
+    def folded(self):
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+profiler = SamplingProfiler(interval=float(os.environ.get("PROFILE_INTERVAL", "0.005")))
+
+
+def init_app(app):
+    @app.before_request
+    def start_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_latency(response):
+        started = g.pop("request_started", None)
+        if started is not None:
+            # Streamed bodies are timed up to the first byte, not the end of the stream
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            request_latency.observe(time.perf_counter() - started, request.method, route, str(response.status_code))
+        timings = g.pop("span_timings", None)
+        if timings:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+        return response
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/debug/profile", methods=["GET", "POST"])
+    def sampling_profile():
+        # POST ?action=start|stop toggles the profiler; GET returns folded stacks so far
+        action = request.args.get("action")
+        if request.method == "POST" and action == "start":
+            profiler.start()
+        elif request.method == "POST" and action == "stop":
+            profiler.stop()
+        if request.method == "POST":
+            return profiler.summary()
+        return Response(profiler.folded(), mimetype="text/plain")
+
+    if os.environ.get("PROFILE_SAMPLING", "0").lower() in ("1", "true", "yes"):
+        profiler.start()
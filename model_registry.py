@@ -0,0 +1,280 @@
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from forest_compiler import COMPILED_SUFFIX, load_compiled
+
+MODEL_EXTENSIONS = (".pkl", ".joblib", COMPILED_SUFFIX)
+
+
+def model_name_for(fname):
+    if fname.endswith(COMPILED_SUFFIX):
+        return fname[:-len(COMPILED_SUFFIX)]
+    return fname.replace(".pkl", "").replace(".joblib", "")
+
+
+def estimate_nbytes(obj, _seen=None, _depth=0):
+    """Rough in-memory size of a fitted model: the NumPy arrays it holds"""
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 6:
+        return 0
+    _seen.add(id(obj))
+
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(estimate_nbytes(v, _seen, _depth + 1) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_nbytes(v, _seen, _depth + 1) for v in obj)
+    # sklearn's Cython Tree keeps its node arrays behind __getstate__
+    if type(obj).__name__ == "Tree" and hasattr(obj, "__getstate__"):
+        return estimate_nbytes(obj.__getstate__(), _seen, _depth + 1)
+    if hasattr(obj, "__dict__"):
+        return estimate_nbytes(vars(obj), _seen, _depth + 1)
+    return 0
+
+
+class BatchRoutedForest:
+    """A compiled forest that hands batches over max_rows to the sklearn original.
+
+    The NumPy traversal wins on small inputs (no per-call overhead) but costs
+    more per row than sklearn's Cython loop on large batches, so the pickled
+    model is loaded on the first such batch and used from then on.
+    """
+
+    def __init__(self, compiled, load_original, max_rows):
+        self.compiled = compiled
+        self.max_rows = max_rows
+        self._load_original = load_original
+        self._original = None
+        self._lock = threading.Lock()
+
+    def original(self):
+        if self._original is None:
+            with self._lock:
+                if self._original is None:
+                    self._original = self._load_original()
+        return self._original
+
+    def _route(self, X):
+        return self.original() if len(X) > self.max_rows else self.compiled
+
+    def predict(self, X):
+        return self._route(X).predict(X)
+
+    def predict_proba(self, X):
+        return self._route(X).predict_proba(X)
+
+    def __getattr__(self, name):
+        return getattr(self.compiled, name)
+
+
+class ModelRegistry:
+    """Dict-like access to the models in ``model_dir``, loaded on first use.
+
+    ``name in registry`` only checks that a model file exists; indexing loads
+    it (once, under a per-model lock). With ``mmap_mode="r"`` joblib maps the
+    model's arrays from disk so forked workers share the same pages. When a
+    compiled forest (``*.forest.npz``) sits next to a pickled model of the same
+    name it is served instead, unless ``prefer_compiled`` is off; inputs of more
+    than ``compiled_max_rows`` rows still go to the pickled model (see
+    BatchRoutedForest, 0 disables). A background watcher can reload models
+    whose files change.
+    """
+
+    def __init__(self, model_dir="models", mmap_mode=None, prefer_compiled=True, compiled_max_rows=500):
+        self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
+        self.prefer_compiled = prefer_compiled
+        self.compiled_max_rows = compiled_max_rows
+        self._paths = {}
+        self._pickled = {}
+        self._models = {}
+        self._info = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop_watch = threading.Event()
+        self.discover()
+
+    def discover(self):
+        """Rescan model_dir; returns {name: mtime} of the files found"""
+        found = {}
+        pickled = {}
+        if os.path.exists(self.model_dir):
+            for fname in os.listdir(self.model_dir):
+                if fname.endswith(MODEL_EXTENSIONS):
+                    name = model_name_for(fname)
+                    compiled = fname.endswith(COMPILED_SUFFIX)
+                    path = os.path.join(self.model_dir, fname)
+                    if not compiled:
+                        pickled[name] = path
+                    if name in found and compiled != self.prefer_compiled:
+                        continue
+                    found[name] = (path, os.path.getmtime(path))
+        with self._lock:
+            self._paths = {name: path for name, (path, _) in found.items()}
+            self._pickled = pickled
+            for name in found:
+                self._locks.setdefault(name, threading.Lock())
+            for name in list(self._models):
+                if name not in found:
+                    del self._models[name]
+                    self._info.pop(name, None)
+                    print(f"Unloaded model: {name} (file removed)")
+        return {name: mtime for name, (_, mtime) in found.items()}
+
+    def _load_file(self, name, path):
+        if path.endswith(COMPILED_SUFFIX):
+            compiled = load_compiled(path)
+            with self._lock:
+                original = self._pickled.get(name)
+            if original is None or not self.compiled_max_rows:
+                return compiled
+            return BatchRoutedForest(compiled, lambda: self._load_pickled(name, original), self.compiled_max_rows)
+        return self._load_pickled(name, path)
+
+    def _load_pickled(self, name, path):
+        try:
+            # Try loading with joblib first
+            import joblib
+            return joblib.load(path, mmap_mode=self.mmap_mode)
+        except Exception as e:
+            print(f"Error loading model {os.path.basename(path)} with joblib: {str(e)}")
+            # Fallback to pickle with specific encoding
+            with open(path, "rb") as f:
+                model = pickle.load(f, encoding='latin1')
+            print(f"Loaded model {name} with pickle (latin1 encoding)")
+            return model
+
+    def load(self, name, force=False):
+        with self._lock:
+            path = self._paths.get(name)
+            lock = self._locks.get(name)
+        if path is None:
+            raise KeyError(name)
+
+        with lock:
+            if not force and name in self._models:
+                return self._models[name]
+            started = time.perf_counter()
+            try:
+                model = self._load_file(name, path)
+            except Exception as e:
+                print(f"Error loading model {name}: {str(e)}")
+                raise
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._models[name] = model
+                self._info[name] = {
+                    "path": path,
+                    "mtime": os.path.getmtime(path),
+                    "file_bytes": os.path.getsize(path),
+                    "memory_bytes": estimate_nbytes(model),
+                    "load_seconds": round(elapsed, 4),
+                    "loaded_at": time.time(),
+                    "mmap_mode": self.mmap_mode,
+                }
+            print(f"Loaded model: {name} in {elapsed:.3f}s")
+            return model
+
+    def load_parallel(self, names=None, max_workers=None):
+        """Load several models concurrently (all known models by default)"""
+        names = [n for n in (names or self.available()) if n in self]
+        if not names:
+            return {}
+        with ThreadPoolExecutor(max_workers=max_workers or min(len(names), os.cpu_count() or 4)) as pool:
+            futures = {name: pool.submit(self.load, name) for name in names}
+        loaded = {}
+        for name, future in futures.items():
+            try:
+                loaded[name] = future.result()
+            except Exception:
+                pass
+        return loaded
+
+    def get(self, name, default=None):
+        try:
+            return self.load(name)
+        except Exception:
+            return default
+
+    def available(self):
+        with self._lock:
+            return sorted(self._paths)
+
+    def keys(self):
+        return self.available()
+
+    def loaded(self):
+        with self._lock:
+            return sorted(self._models)
+
+    def __contains__(self, name):
+        with self._lock:
+            return name in self._paths
+
+    def __getitem__(self, name):
+        return self.load(name)
+
+    def __iter__(self):
+        return iter(self.available())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._paths)
+
+    # Hot reload
+
+    def check_for_changes(self):
+        """Reload loaded models whose file changed; returns the reloaded names"""
+        mtimes = self.discover()
+        with self._lock:
+            stale = [name for name, info in self._info.items()
+                     if name in mtimes and (mtimes[name] != info["mtime"] or self._paths[name] != info["path"])]
+        reloaded = []
+        for name in stale:
+            try:
+                self.load(name, force=True)
+                reloaded.append(name)
+                print(f"Reloaded model: {name}")
+            except Exception:
+                pass
+        return reloaded
+
+    def start_watcher(self, interval=5.0):
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop_watch.clear()
+
+        def watch():
+            while not self._stop_watch.wait(interval):
+                try:
+                    self.check_for_changes()
+                except Exception as e:
+                    print(f"Model watcher error: {str(e)}")
+
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop_watch.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def stats(self):
+        with self._lock:
+            info = {name: dict(values) for name, values in self._info.items()}
+            available = sorted(self._paths)
+        return {
+            "model_dir": self.model_dir,
+            "available": available,
+            "loaded": info,
+            "watching": self._watcher is not None and self._watcher.is_alive(),
+        }
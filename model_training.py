@@ -1,48 +1,243 @@
-import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import accuracy_score, classification_report
+import sklearn
 import joblib
+import argparse
+import hashlib
+import json
 import os
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import data_ingest
+import feature_store
+from forest_compiler import COMPILED_SUFFIX, compile_forest, save_compiled, verify_compiled
 
-df = pd.read_csv('backend/merged_data.csv')
-print(df.head())
-print(df.dtypes)
-
-# Split blood_pressure into systolic and diastolic
-df['systolic_bp'] = df['blood_pressure'].str.split('/').str[0].astype(float)
-df['diastolic_bp'] = df['blood_pressure'].str.split('/').str[1].astype(float)
-
-targets = ['disease', 'medication_name', 'dosage']
-features = ['age', 'height', 'weight', 'systolic_bp', 'diastolic_bp', 'heart_rate', 'temperature']
-df_encoded = df[features].copy()
-
-# Create models directory if it doesn't exist
+data_path = 'backend/merged_data.csv'
 models_dir = 'backend/models'
-os.makedirs(models_dir, exist_ok=True)
+store_dir = 'backend/feature_store'
+db_path = 'backend/healthcare.db'
+manifest_path = os.path.join(models_dir, 'training_manifest.json')
+report_path = os.path.join(models_dir, 'training_report.json')
+
+targets = feature_store.TARGETS
+features = feature_store.FEATURES
+model_names = ['LogisticRegression', 'RandomForest', 'GradientBoosting']
 
 def sanitize_filename(name):
     return re.sub(r'[^a-zA-Z0-9_\-]', '_', name)
 
-for target in targets:
-    y = df[target]
-    X_train, X_test, y_train, y_test = train_test_split(df_encoded, y, test_size=0.2, random_state=42)
-    
-    models = {
-        'LogisticRegression': LogisticRegression(max_iter=1000),
-        'RandomForest': RandomForestClassifier(random_state=42),
-        'GradientBoosting': GradientBoostingClassifier(random_state=42)
+def build_model(model_name, n_jobs=None):
+    if model_name == 'LogisticRegression':
+        return LogisticRegression(max_iter=1000)
+    if model_name == 'RandomForest':
+        return RandomForestClassifier(random_state=42, n_jobs=n_jobs)
+    if model_name == 'GradientBoosting':
+        return GradientBoostingClassifier(random_state=42)
+    raise ValueError(f"Unknown model: {model_name}")
+
+def prepare_features(args):
+    """Import the CSV into the feature store (if changed) and a train/test split shared by every target and model family"""
+    store = feature_store.FeatureStore(store_dir)
+    csv_meta = data_ingest.ensure_imported(data_path, store, chunksize=args.chunksize)
+    partitions = ['csv']
+    data = {'csv': csv_meta['sha256']}
+    if args.include_logged:
+        if os.path.exists(db_path):
+            print(f"Synced {store.sync_predictions(db_path)} new logged predictions from {db_path}")
+        logged_meta = store.tables['logged'].meta()
+        partitions.append('logged')
+        data['logged'] = [logged_meta['rows'], logged_meta.get('high_water', 0)]
+    data_hash = hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    rows = sum(store.tables[name].meta()['rows'] for name in partitions)
+
+    paths = {
+        'store': store_dir,
+        'partitions': partitions,
+        'train_idx': os.path.join(store_dir, 'train_idx.npy'),
+        'test_idx': os.path.join(store_dir, 'test_idx.npy'),
+    }
+    split_path = os.path.join(store_dir, 'split.json')
+    split = {}
+    if os.path.exists(split_path):
+        with open(split_path) as f:
+            split = json.load(f)
+    if split.get('data') != data_hash or not all(os.path.exists(paths[key]) for key in ('train_idx', 'test_idx')):
+        train_idx, test_idx = train_test_split(np.arange(rows), test_size=0.2, random_state=42)
+        np.save(paths['train_idx'], train_idx)
+        np.save(paths['test_idx'], test_idx)
+        with open(split_path, 'w') as f:
+            json.dump({'data': data_hash, 'rows': rows}, f)
+    return data_hash, paths
+
+def fit_hash(data_hash, model_name, fit_targets, model):
+    # n_jobs changes speed, not the fitted model, so it is left out of the hash
+    params = {k: v for k, v in model.get_params().items() if k != 'n_jobs'}
+    key = json.dumps({
+        'data': data_hash,
+        'model': model_name,
+        'targets': fit_targets,
+        'params': repr(sorted(params.items())),
+        'sklearn': sklearn.__version__,
+        'ingest': data_ingest.CACHE_VERSION,
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+def save_compiled_forest(model, X_test, filename_stem):
+    # Export forests as flat arrays for fast inference at serve time
+    compiled = compile_forest(model)
+    if not verify_compiled(model, compiled, X_test):
+        raise RuntimeError(f"Compiled forest {filename_stem} does not match sklearn predictions")
+    compiled_name = f"{filename_stem}{COMPILED_SUFFIX}"
+    save_compiled(compiled, os.path.join(models_dir, compiled_name))
+    return compiled_name
+
+def run_fit(job):
+    """Fit, evaluate and save one model; runs inside a worker process"""
+    paths = job['paths']
+    X, target_columns = feature_store.FeatureStore(paths['store']).load(paths['partitions'])
+    train_idx = np.load(paths['train_idx'])
+    test_idx = np.load(paths['test_idx'])
+    y = np.column_stack([data_ingest.target_labels(target_columns[target]) for target in job['targets']])
+    if y.shape[1] == 1:
+        y = y[:, 0]
+    X_train, X_test = X[train_idx], X[test_idx]
+    y_train, y_test = y[train_idx], y[test_idx]
+
+    model = build_model(job['model_name'], job['n_jobs'])
+    started = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    y_pred = model.predict(X_test)
+    predict_seconds = time.perf_counter() - started
+
+    if y.ndim == 1:
+        accuracy = {job['targets'][0]: accuracy_score(y_test, y_pred)}
+        report = classification_report(y_test, y_pred, zero_division=0)
+    else:
+        accuracy = {target: accuracy_score(y_test[:, i], y_pred[:, i]) for i, target in enumerate(job['targets'])}
+        report = None
+
+    joblib.dump(model, os.path.join(models_dir, f"{job['filename_stem']}.joblib"))
+    if isinstance(model, RandomForestClassifier):
+        save_compiled_forest(model, X_test, job['filename_stem'])
+
+    return {
+        'fit_seconds': fit_seconds,
+        'predict_seconds': predict_seconds,
+        'accuracy': accuracy,
+        'report': report,
     }
-    
-    for model_name, model in models.items():
-        model.fit(X_train, y_train)
-        y_pred = model.predict(X_test)
-        print(f"Classification report for {model_name} on target '{target}':")
-        print(classification_report(y_test, y_pred))
-        
-        filename = f"{sanitize_filename(model_name)}_{sanitize_filename(target)}.joblib"
-        filepath = os.path.join(models_dir, filename)
-        joblib.dump(model, filepath)
+
+def load_manifest():
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            return json.load(f)
+    return {}
+
+def artifacts_exist(job):
+    stem = os.path.join(models_dir, job['filename_stem'])
+    if not os.path.exists(f"{stem}.joblib"):
+        return False
+    return job['model_name'] != 'RandomForest' or os.path.exists(f"{stem}{COMPILED_SUFFIX}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Train disease, medication and dosage models")
+    parser.add_argument('--multi-output', action='store_true',
+                        help="also fit one RandomForest over all three targets and compare it with the per-target models")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="number of fits to run concurrently (process pool size)")
+    parser.add_argument('--force', action='store_true',
+                        help="retrain every model even if its data and parameters are unchanged")
+    parser.add_argument('--chunksize', type=int, default=data_ingest.DEFAULT_CHUNKSIZE,
+                        help="CSV rows parsed per chunk when (re)importing the CSV into the feature store")
+    parser.add_argument('--include-logged', action='store_true',
+                        help="also train on predictions logged in the app database (synced into the feature store)")
+    args = parser.parse_args()
+
+    # Create models directory if it doesn't exist
+    os.makedirs(models_dir, exist_ok=True)
+
+    data_hash, paths = prepare_features(args)
+
+    # With several fits in flight each forest stays single-threaded to avoid
+    # oversubscribing the CPUs; a lone worker lets forests use every core
+    n_jobs = 1 if args.jobs > 1 else -1
+
+    fits = [(model_name, [target]) for target in targets for model_name in model_names]
+    if args.multi_output:
+        # One RandomForest over all three targets: a single artifact and a single
+        # predict call at serve time instead of three forests per request
+        fits.append(('RandomForest', list(targets)))
+
+    manifest = load_manifest()
+    jobs = []
+    for model_name, fit_targets in fits:
+        if len(fit_targets) == 1:
+            filename_stem = f"{sanitize_filename(model_name)}_{sanitize_filename(fit_targets[0])}"
+        else:
+            filename_stem = f"{sanitize_filename(model_name)}_multioutput"
+        jobs.append({
+            'model_name': model_name,
+            'targets': fit_targets,
+            'filename_stem': filename_stem,
+            'hash': fit_hash(data_hash, model_name, fit_targets, build_model(model_name)),
+            'n_jobs': n_jobs,
+            'paths': paths,
+        })
+
+    pending = [job for job in jobs
+               if args.force or manifest.get(job['filename_stem'], {}).get('hash') != job['hash']
+               or not artifacts_exist(job)]
+    skipped = [job for job in jobs if job not in pending]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.jobs, len(pending) or 1))) as pool:
+        futures = [(job, pool.submit(run_fit, job)) for job in pending]
+        results = {job['filename_stem']: future.result() for job, future in futures}
+    total_seconds = time.perf_counter() - started
+
+    report = []
+    for job in jobs:
+        stem = job['filename_stem']
+        if stem in results:
+            result = results[stem]
+            if result['report']:
+                print(f"Classification report for {job['model_name']} on target '{job['targets'][0]}':")
+                print(result['report'])
+            manifest[stem] = {
+                'hash': job['hash'],
+                'accuracy': result['accuracy'],
+                'fit_seconds': result['fit_seconds'],
+            }
+            report.append({'model': stem, 'status': 'trained', 'fit_seconds': result['fit_seconds'],
+                           'predict_seconds': result['predict_seconds'], 'accuracy': result['accuracy']})
+        else:
+            report.append({'model': stem, 'status': 'skipped', 'fit_seconds': 0.0,
+                           'predict_seconds': 0.0, 'accuracy': manifest[stem]['accuracy']})
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    with open(report_path, 'w') as f:
+        json.dump({'total_seconds': total_seconds, 'jobs': args.jobs, 'fits': report}, f, indent=2)
+
+    print(f"Timing report ({len(pending)} trained, {len(skipped)} unchanged, {total_seconds:.2f}s wall clock):")
+    for entry in report:
+        accuracy = ", ".join(f"{target}={value:.3f}" for target, value in entry['accuracy'].items())
+        print(f"  {entry['model']:<40} {entry['status']:<8} fit {entry['fit_seconds']:8.3f}s  "
+              f"predict {entry['predict_seconds']:7.3f}s  {accuracy}")
+
+    if args.multi_output:
+        print("Multi-output RandomForest vs per-target RandomForest (test accuracy):")
+        multi_accuracy = manifest['RandomForest_multioutput']['accuracy']
+        for target in targets:
+            single_accuracy = manifest[f"RandomForest_{sanitize_filename(target)}"]['accuracy'][target]
+            print(f"  {target:<16} multi-output {multi_accuracy[target]:.3f}   per-target {single_accuracy:.3f}")
+
+if __name__ == "__main__":
+    main()
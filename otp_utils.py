@@ -1,26 +1,216 @@
+import hmac
+import os
 import random
 import string
+import threading
+import time
+from collections import deque
 
-# Simple OTP storage (in production, use database or cache)
-otp_storage = {}
+import database
+import mail_dispatch
+
+# OTP settings
+OTP_TTL = 10 * 60              # seconds a code stays valid
+MAX_VERIFY_ATTEMPTS = 5        # wrong guesses before a code is discarded
+MAX_ISSUES_PER_WINDOW = 5      # codes that can be issued per email per window
+ISSUE_WINDOW = 15 * 60         # seconds
+SWEEP_INTERVAL = 60            # seconds between sweeps of expired codes
+
+
+class OTPRateLimitError(Exception):
+    """Too many codes requested for one email"""
+
+
+class InMemoryOTPStore:
+    """Per-process store: dict lookups, expired codes swept lazily"""
+
+    def __init__(self, ttl=OTP_TTL, max_attempts=MAX_VERIFY_ATTEMPTS,
+                 max_issues=MAX_ISSUES_PER_WINDOW, issue_window=ISSUE_WINDOW, sweep_interval=SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_issues = max_issues
+        self.issue_window = issue_window
+        self.sweep_interval = sweep_interval
+        self._codes = {}     # email -> [otp, expires_at, attempts]
+        self._issues = {}    # email -> deque of issue times
+        self._lock = threading.Lock()
+        self._last_sweep = time.time()
+
+    def _maybe_sweep(self, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        for email in [e for e, entry in self._codes.items() if entry[1] <= now]:
+            del self._codes[email]
+        for email in list(self._issues):
+            issued = self._issues[email]
+            while issued and issued[0] <= now - self.issue_window:
+                issued.popleft()
+            if not issued:
+                del self._issues[email]
+
+    def store(self, email, otp):
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            issued = self._issues.setdefault(email, deque())
+            while issued and issued[0] <= now - self.issue_window:
+                issued.popleft()
+            if len(issued) >= self.max_issues:
+                raise OTPRateLimitError(f"Too many codes requested for {email}, try again later")
+            issued.append(now)
+            # A new code replaces any previous one for the same email
+            self._codes[email] = [otp, now + self.ttl, 0]
+
+    def verify(self, email, otp):
+        now = time.time()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._codes.get(email)
+            if entry is None:
+                return False
+            stored_otp, expires_at, attempts = entry
+            if expires_at <= now:
+                del self._codes[email]
+                return False
+            if hmac.compare_digest(stored_otp.encode(), str(otp).encode()):
+                del self._codes[email]
+                return True
+            entry[2] = attempts + 1
+            if entry[2] >= self.max_attempts:
+                del self._codes[email]
+            return False
+
+    def sweep(self):
+        with self._lock:
+            self._last_sweep = 0
+            self._maybe_sweep(time.time())
+
+    def stats(self):
+        with self._lock:
+            return {"backend": "memory", "codes": len(self._codes), "emails_rate_tracked": len(self._issues)}
+
+
+class SQLiteOTPStore:
+    """Store shared by every worker process through SQLite (lookups by primary key)"""
+
+    def __init__(self, db_path=None, ttl=OTP_TTL, max_attempts=MAX_VERIFY_ATTEMPTS,
+                 max_issues=MAX_ISSUES_PER_WINDOW, issue_window=ISSUE_WINDOW, sweep_interval=SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.max_attempts = max_attempts
+        self.max_issues = max_issues
+        self.issue_window = issue_window
+        self.sweep_interval = sweep_interval
+        self._pool = database.ConnectionPool(db_path)
+        self._last_sweep = 0.0
+        conn = self._pool.get()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS otp_codes (
+                email TEXT PRIMARY KEY,
+                otp TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS idx_otp_codes_expires ON otp_codes (expires_at);
+            CREATE TABLE IF NOT EXISTS otp_issues (
+                email TEXT NOT NULL,
+                issued_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_otp_issues_email ON otp_issues (email, issued_at);
+        """)
+
+    def _maybe_sweep(self, conn, now):
+        if now - self._last_sweep < self.sweep_interval:
+            return
+        self._last_sweep = now
+        conn.execute("DELETE FROM otp_codes WHERE expires_at <= ?", (now,))
+        conn.execute("DELETE FROM otp_issues WHERE issued_at <= ?", (now - self.issue_window,))
+
+    def store(self, email, otp):
+        now = time.time()
+        conn = self._pool.get()
+        with conn:
+            # BEGIN IMMEDIATE so two workers can't both pass the rate check
+            conn.execute("BEGIN IMMEDIATE")
+            self._maybe_sweep(conn, now)
+            issued = conn.execute("SELECT COUNT(*) FROM otp_issues WHERE email=? AND issued_at > ?",
+                                  (email, now - self.issue_window)).fetchone()[0]
+            if issued >= self.max_issues:
+                raise OTPRateLimitError(f"Too many codes requested for {email}, try again later")
+            conn.execute("INSERT INTO otp_issues (email, issued_at) VALUES (?, ?)", (email, now))
+            conn.execute("""
+                INSERT INTO otp_codes (email, otp, expires_at, attempts) VALUES (?, ?, ?, 0)
+                ON CONFLICT (email) DO UPDATE SET
+                    otp=excluded.otp, expires_at=excluded.expires_at, attempts=0
+            """, (email, otp, now + self.ttl))
+
+    def verify(self, email, otp):
+        now = time.time()
+        conn = self._pool.get()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._maybe_sweep(conn, now)
+            row = conn.execute("SELECT otp, expires_at, attempts FROM otp_codes WHERE email=?", (email,)).fetchone()
+            if row is None:
+                return False
+            if row["expires_at"] <= now:
+                conn.execute("DELETE FROM otp_codes WHERE email=?", (email,))
+                return False
+            if hmac.compare_digest(row["otp"].encode(), str(otp).encode()):
+                conn.execute("DELETE FROM otp_codes WHERE email=?", (email,))
+                return True
+            if row["attempts"] + 1 >= self.max_attempts:
+                conn.execute("DELETE FROM otp_codes WHERE email=?", (email,))
+            else:
+                conn.execute("UPDATE otp_codes SET attempts = attempts + 1 WHERE email=?", (email,))
+            return False
+
+    def sweep(self):
+        conn = self._pool.get()
+        with conn:
+            self._last_sweep = 0.0
+            self._maybe_sweep(conn, time.time())
+
+    def stats(self):
+        conn = self._pool.get()
+        codes = conn.execute("SELECT COUNT(*) FROM otp_codes").fetchone()[0]
+        issues = conn.execute("SELECT COUNT(DISTINCT email) FROM otp_issues").fetchone()[0]
+        return {"backend": "sqlite", "codes": codes, "emails_rate_tracked": issues}
+
+
+def create_store():
+    """OTP store selected by OTP_STORE (memory or sqlite) and OTP_DB_PATH"""
+    backend = os.environ.get("OTP_STORE", "memory").lower()
+    if backend == "sqlite":
+        return SQLiteOTPStore(os.environ.get("OTP_DB_PATH") or None)
+    if backend != "memory":
+        raise ValueError(f"Unknown OTP_STORE backend: {backend}")
+    return InMemoryOTPStore()
+
+
+# OTP storage (in-memory per process by default, OTP_STORE=sqlite to share across workers)
+otp_store = create_store()
 
 def generate_otp():
     return ''.join(random.choices(string.digits, k=6))
 
 def store_otp(email, otp):
-    otp_storage[email] = otp
+    otp_store.store(email, otp)
 
 def verify_otp(email, otp):
-    stored_otp = otp_storage.get(email)
-    if stored_otp and stored_otp == otp:
-        del otp_storage[email]
-        return True
-    return False
+    return otp_store.verify(email, otp)
 
 def send_otp_email(email, otp):
-    # For demo, print the OTP
-    print(f"OTP for {email}: {otp}")
-    # In production, send email
-    # import smtplib
-    # etc.
-    return True
+    """Queue the OTP email (returns the message id), or print the code when SMTP is not configured"""
+    mailer = mail_dispatch.get_dispatcher()
+    if mailer is None:
+        # For demo, print the OTP
+        print(f"OTP for {email}: {otp}")
+        return True
+    message_id = mailer.send(email, "Your verification code",
+                             f"Your verification code is {otp}. It expires in {OTP_TTL // 60} minutes.")
+    return message_id if message_id is not None else False
+
+def otp_delivery_status(message_id):
+    mailer = mail_dispatch.get_dispatcher()
+    return mailer.status(message_id) if mailer is not None else None
@@ -0,0 +1,162 @@
+import atexit
+import queue
+import threading
+import time
+
+import database
+
+INSERT_PREDICTION_SQL = """
+    INSERT INTO predictions (user_id, age, height_cm, weight_kg, systolic_bp, diastolic_bp, heart_rate, temperature, prediction, medication, dosage)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class PredictionWriter:
+    """Write-behind queue for prediction rows.
+
+    Request threads enqueue rows and return immediately; a single background
+    thread drains the queue and group-commits batches when either
+    ``batch_size`` rows are waiting or ``flush_interval`` seconds have passed,
+    then calls ``on_commit(batch)`` if given.
+    When the queue is full ``submit`` blocks for up to ``put_timeout`` seconds
+    and then gives up, returning how many rows it queued so callers can write
+    the rest directly.
+    """
+
+    def __init__(self, db_path=None, max_queue=10000, batch_size=500,
+                 flush_interval=0.05, put_timeout=1.0, on_commit=None):
+        self.db_path = db_path
+        self.on_commit = on_commit
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._counters = {
+            "enqueued": 0,
+            "written": 0,
+            "batches": 0,
+            "rejected": 0,
+            "failed": 0,
+            "flush_seconds_total": 0.0,
+            "flush_seconds_max": 0.0,
+            "flush_seconds_last": 0.0,
+        }
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="prediction-writer", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, rows):
+        """Queue prediction rows (tuples matching INSERT_PREDICTION_SQL), returns the number queued"""
+        if self._stop.is_set():
+            return 0
+        queued = 0
+        for row in rows:
+            try:
+                self._queue.put(row, timeout=self.put_timeout)
+            except queue.Full:
+                with self._lock:
+                    self._counters["rejected"] += len(rows) - queued
+                break
+            queued += 1
+        with self._lock:
+            self._counters["enqueued"] += queued
+        return queued
+
+    def _drain(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, conn, batch):
+        started = time.perf_counter()
+        try:
+            conn.executemany(INSERT_PREDICTION_SQL, batch)
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            with self._lock:
+                self._counters["failed"] += len(batch)
+            print(f"Prediction writer error: {str(e)}")
+            return
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._counters["written"] += len(batch)
+            self._counters["batches"] += 1
+            self._counters["flush_seconds_total"] += elapsed
+            self._counters["flush_seconds_last"] = elapsed
+            self._counters["flush_seconds_max"] = max(self._counters["flush_seconds_max"], elapsed)
+        if self.on_commit is not None:
+            try:
+                self.on_commit(batch)
+            except Exception as e:
+                print(f"Prediction writer on_commit error: {str(e)}")
+
+    def _run(self):
+        conn = database.connect(self.db_path)
+        try:
+            while not (self._stop.is_set() and self._queue.empty()):
+                try:
+                    first = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    continue
+                batch = self._drain(first)
+                self._write(conn, batch)
+                for _ in batch:
+                    self._queue.task_done()
+        finally:
+            conn.close()
+
+    def flush(self, timeout=None):
+        """Block until every queued row has been committed"""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.005)
+        return True
+
+    def stop(self, timeout=10.0):
+        """Stop accepting rows, write out everything queued and join the thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        batches = counters["batches"]
+        counters["queue_depth"] = self._queue.qsize()
+        counters["queue_capacity"] = self._queue.maxsize
+        counters["flush_seconds_avg"] = counters["flush_seconds_total"] / batches if batches else 0.0
+        counters["running"] = self._thread is not None and self._thread.is_alive()
+        return counters
+
+
+writer = None
+
+
+def start_writer(**kwargs):
+    global writer
+    if writer is None:
+        writer = PredictionWriter(**kwargs).start()
+        atexit.register(writer.stop)
+    return writer
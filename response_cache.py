@@ -0,0 +1,119 @@
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+
+from flask import Response, request
+
+# HTTP response caching for the read-only JSON API. Constant payloads are
+# serialized once and served with ETag/Last-Modified validators; per-user
+# query results live in a short TTL cache that prediction inserts invalidate.
+# Other server processes don't see those invalidations, so per-user entries
+# also carry the user's data version and are dropped when it has moved on.
+
+
+def serialize(payload):
+    return json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+
+
+class CachedBody:
+    def __init__(self, body, last_modified=None, headers=None):
+        self.body = body
+        self.headers = headers or {}
+        self.etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        self.last_modified = int(last_modified if last_modified is not None else time.time())
+        self.last_modified_header = formatdate(self.last_modified, usegmt=True)
+
+
+def not_modified(cached):
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or cached.etag in tags or f"W/{cached.etag}" in tags
+    if_modified_since = request.headers.get("If-Modified-Since")
+    if if_modified_since:
+        try:
+            return int(parsedate_to_datetime(if_modified_since).timestamp()) >= cached.last_modified
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def json_response(cached, max_age=0):
+    """Serve cached JSON, or 304 Not Modified when the client's copy is current"""
+    headers = {
+        **cached.headers,
+        "ETag": cached.etag,
+        "Last-Modified": cached.last_modified_header,
+        "Cache-Control": f"max-age={max_age}, must-revalidate" if max_age else "no-cache",
+    }
+    if not_modified(cached):
+        return Response(status=304, headers=headers)
+    return Response(cached.body, mimetype="application/json", headers=headers)
+
+
+class StaticPayload:
+    """A constant payload serialized once at startup"""
+
+    def __init__(self, payload, max_age=300):
+        self.cached = CachedBody(serialize(payload))
+        self.max_age = max_age
+
+    def response(self):
+        return json_response(self.cached, self.max_age)
+
+
+class UserResponseCache:
+    """Short-lived cache of per-user JSON responses, keyed by user and request path.
+
+    version is any cheap value that changes with the user's data (read before
+    building the payload); an entry stored under another version is a miss.
+    """
+
+    def __init__(self, ttl=30, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, key, version=None):
+        with self._lock:
+            entry = self._entries.get(user_id, {}).get(key)
+            if entry is None or entry[2] != version or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id, key, payload, headers=None, version=None):
+        cached = CachedBody(serialize(payload), headers=headers)
+        with self._lock:
+            if self._count >= self.max_entries:
+                # Entries are short-lived anyway; start over rather than track LRU order
+                self._entries.clear()
+                self._count = 0
+            entries = self._entries.setdefault(user_id, {})
+            if key not in entries:
+                self._count += 1
+            entries[key] = (cached, time.monotonic(), version)
+        return cached
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            self._count -= len(self._entries.pop(user_id, {}))
+
+    def stats(self):
+        with self._lock:
+            entries = self._count
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_matcher import IntentMatcher, load_intents
+
+engine = load_intents()
+
+
+@pytest.mark.parametrize("message, intent", [
+    ("I have a headache", "headache"),
+    ("I have headaches", "headache"),
+    ("any workouts for beginners?", "exercise"),
+    ("I keep exercising", "exercise"),
+    ("healthy foods please", "nutrition"),
+    ("trouble sleeping", "sleep"),
+    ("Hi!", "greeting"),
+])
+def test_inflected_keywords_match(message, intent):
+    assert engine.match(message)["name"] == intent
+
+
+def test_keywords_match_whole_words_only():
+    assert engine.match("this is it") is None
+    assert engine.match("his theory") is None
+
+
+def test_earlier_intent_wins():
+    matcher = IntentMatcher([{"name": "a", "keywords": ["sleep"]}, {"name": "b", "keywords": ["food"]}])
+    assert matcher.match("food before sleep")["name"] == "a"
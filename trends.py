@@ -0,0 +1,83 @@
+from datetime import datetime
+
+# Per-user health trends read from the rollup tables kept by the triggers in
+# database.MIGRATIONS (2): one row per (user, period, bucket), so a chart
+# costs O(buckets) however much history sits behind it. Temperatures are °C;
+# a reading is "normal" when BP < 130/85, HR 60-100 and 36.1-37.5 °C, and the
+# health score is the share of normal readings.
+PERIODS = {"day": 30, "week": 26, "month": 12}   # period -> default number of buckets
+MAX_BUCKETS = 400
+VITALS = ("systolic_bp", "diastolic_bp", "heart_rate", "temperature")
+SUM_COLUMNS = {"systolic_bp": "systolic", "diastolic_bp": "diastolic",
+               "heart_rate": "heart_rate", "temperature": "temperature"}
+
+
+def health_score(samples, normal_samples):
+    return round(100 * normal_samples / samples) if samples else None
+
+
+def average(total, count):
+    return round(total / count, 1) if count else None
+
+
+def bucket_label(period, bucket):
+    if period == "month":
+        return datetime.strptime(bucket, "%Y-%m").strftime("%b %Y")
+    return bucket
+
+
+def user_trends(conn, user_id, period="month", buckets=None):
+    """Chart payload: the last `buckets` non-empty buckets of `period`, oldest first"""
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of: {', '.join(PERIODS)}")
+    buckets = min(max(1, buckets or PERIODS[period]), MAX_BUCKETS)
+
+    rows = conn.execute("""
+        SELECT * FROM prediction_rollups
+        WHERE user_id=? AND period=? AND samples > 0
+        ORDER BY bucket DESC
+        LIMIT ?
+    """, (user_id, period, buckets)).fetchall()[::-1]
+
+    index = {row["bucket"]: i for i, row in enumerate(rows)}
+    conditions = {}
+    if rows:
+        for bucket, condition, count in conn.execute("""
+            SELECT bucket, condition, count FROM prediction_condition_rollups
+            WHERE user_id=? AND period=? AND bucket >= ? AND count > 0
+        """, (user_id, period, rows[0]["bucket"])):
+            if bucket in index:
+                conditions.setdefault(condition, [0] * len(rows))[index[bucket]] = count
+
+    payload = {
+        "period": period,
+        "buckets": [row["bucket"] for row in rows],
+        "labels": [bucket_label(period, row["bucket"]) for row in rows],
+        "samples": [row["samples"] for row in rows],
+        "health_scores": [health_score(row["samples"], row["normal_samples"]) for row in rows],
+        "conditions": dict(sorted(conditions.items(), key=lambda item: -sum(item[1]))),
+    }
+    for vital in VITALS:
+        column = SUM_COLUMNS[vital]
+        payload[vital] = [average(row[f"{column}_sum"], row[f"{column}_count"]) for row in rows]
+    return payload
+
+
+def recent_summary(conn, user_id, days=30):
+    """Health score and average vitals over the last `days` daily buckets"""
+    row = conn.execute("""
+        SELECT TOTAL(samples) AS samples, TOTAL(normal_samples) AS normal_samples,
+               TOTAL(systolic_sum) AS systolic_sum, TOTAL(systolic_count) AS systolic_count,
+               TOTAL(diastolic_sum) AS diastolic_sum, TOTAL(diastolic_count) AS diastolic_count,
+               TOTAL(heart_rate_sum) AS heart_rate_sum, TOTAL(heart_rate_count) AS heart_rate_count,
+               TOTAL(temperature_sum) AS temperature_sum, TOTAL(temperature_count) AS temperature_count
+        FROM prediction_rollups
+        WHERE user_id=? AND period='day' AND bucket >= date('now', ?)
+    """, (user_id, f"-{days - 1} days")).fetchone()
+    return {
+        "days": days,
+        "readings": int(row["samples"]),
+        "health_score": health_score(row["samples"], row["normal_samples"]),
+        "averages": {vital: average(row[f"{SUM_COLUMNS[vital]}_sum"], row[f"{SUM_COLUMNS[vital]}_count"])
+                     for vital in VITALS},
+    }